@@ -0,0 +1,76 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import time
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from checks import random_edges
+from colcache import read_cache, resolve_cache
+from paths import k_shortest_paths, landmarks, shortest_path
+from routegraph import RouteGraph, WEIGHTS
+
+
+def check_equivalence(trials: int, seed: int):
+    rng = np.random.default_rng(seed)
+    checked = 0
+    for trial in range(trials):
+        graph = RouteGraph.from_edges(random_edges(int(rng.integers(8, 60)), int(rng.integers(20, 400)), rng))
+        # landmarks are built on the whole graph; queries run on filtered subgraphs
+        mask = graph.filter_mask(max_delay=float(rng.uniform(0.2, 1.0))) if trial % 2 else None
+        view = graph.view(mask)
+        for _ in range(10):
+            s, t = rng.choice(graph.airports, 2, replace=False)
+            weight = WEIGHTS[int(rng.integers(0, len(WEIGHTS)))]
+            got = shortest_path(graph, s, t, weight, mask=mask)
+            want = k_shortest_paths(graph, s, t, weight, 1, mask=mask)
+            assert bool(got) == bool(want), (s, t, weight)
+            if got:
+                assert all(view.has_edge(a, b) for a, b in zip(got, got[1:]))
+                assert abs(view.route_cost(got, weight) - view.route_cost(want[0], weight)) <= 1e-9
+            checked += 1
+    print(f"equivalence: {checked} random queries match the Yen k=1 cost")
+
+def bench_pairs(pairs: int, seed: int):
+    edges = read_cache(resolve_cache(ROOT / "cache", "edges_min_2025"))
+    graph = RouteGraph.from_edges(edges)
+    mask = graph.filter_mask((0, 800), 0.4)
+    rng = np.random.default_rng(seed)
+    sample = [tuple(rng.choice(graph.airports, 2, replace=False)) for _ in range(pairs)]
+
+    for weight in WEIGHTS:
+        t0 = time.perf_counter()
+        landmarks(graph, weight)
+        t_build = time.perf_counter() - t0
+        # Yen's first path comes from a full reverse Dijkstra: every node that reaches t is settled
+        t0 = time.perf_counter()
+        for s, t in sample:
+            k_shortest_paths(graph, s, t, weight, 1, mask=mask)
+        row = [f"yen k=1 {(time.perf_counter() - t0) / pairs * 1e3:5.2f} ms {graph.view(mask).number_of_nodes():5d} nodes"]
+        for name, heuristic in [("dijkstra", False), ("alt a*", True)]:
+            settled = []
+            t0 = time.perf_counter()
+            for s, t in sample:
+                st = {}
+                shortest_path(graph, s, t, weight, mask, heuristic=heuristic, stats=st)
+                settled.append(st.get("settled", 0))
+            elapsed = (time.perf_counter() - t0) / pairs * 1e3
+            row.append(f"{name} {elapsed:5.2f} ms {np.mean(settled):5.0f} nodes")
+        print(f"{weight:<8} (landmarks {t_build * 1e3:4.0f} ms once): " + "  |  ".join(row))
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Check and time the single best-path search.")
+    ap.add_argument("--trials", type=int, default=200)
+    ap.add_argument("--pairs", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+    check_equivalence(args.trials, args.seed)
+    bench_pairs(args.pairs, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from colcache import read_cache, write_cache
+
+
+def as_plain(df: pd.DataFrame) -> pd.DataFrame:
+    # categorical codes come back from the columnar reader; compare on decoded values
+    out = df.copy()
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object).astype("str")
+    return out
+
+def best_of(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Round-trip and time the JSON vs columnar cache formats.")
+    ap.add_argument("--cache", type=Path, default=ROOT / "cache")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for stem in ["edges_2025", "edges_min_2025", "nodes_2025"]:
+            src = args.cache / f"{stem}.json"
+            t_json, df = best_of(lambda: read_cache(src), args.repeat)
+            col = Path(tmp) / f"{stem}.col"
+            write_cache(df, col)
+
+            t_mmap, back = best_of(lambda: read_cache(col), args.repeat)
+            pd.testing.assert_frame_equal(as_plain(back), df)
+            t_read, back = best_of(lambda: read_cache(col, use_mmap=False, categorical=False), args.repeat)
+            pd.testing.assert_frame_equal(back, df)
+
+            print(f"{stem:<15} json {src.stat().st_size/1e6:6.2f} MB {t_json*1e3:8.1f} ms | "
+                  f"columnar {col.stat().st_size/1e6:6.2f} MB  mmap {t_mmap*1e3:7.2f} ms  "
+                  f"read {t_read*1e3:7.2f} ms | round-trip ok")
+
+if __name__ == "__main__":
+    main()
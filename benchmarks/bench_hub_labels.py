@@ -0,0 +1,64 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from checks import check_route
+from colcache import read_cache, resolve_cache
+from hublabels import attach, build_hub_labels, default_views
+from paths import shortest_path
+from routegraph import RouteGraph, WEIGHTS
+from routetable import default_price_range
+
+
+def bench_cache(pairs: int, seed: int):
+    edges = read_cache(resolve_cache(ROOT / "cache", "edges_min_2025"))
+    graph = RouteGraph.from_edges(edges)
+    views = default_views(graph, default_price_range(edges))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "hub_labels.sqlite"
+        t0 = time.perf_counter()
+        sizes = build_hub_labels(graph, views, path)
+        print(f"built {len(sizes)} label sets for {graph.n_nodes} airports / {graph.n_edges} routes "
+              f"in {time.perf_counter() - t0:.1f} s")
+        store = attach(graph, path)
+        rng = np.random.default_rng(seed)
+        sample = [tuple(rng.choice(graph.airports, 2, replace=False)) for _ in range(pairs)]
+        for name, mask in views.items():
+            for weight in WEIGHTS:
+                t0 = time.perf_counter()
+                labels = store.get(weight, mask)
+                t_load = time.perf_counter() - t0
+                per_entry = labels.size() / max(1, 2 * graph.n_nodes)
+                timings = {}
+                for mode, kw in [("hub labels", {}), ("alt a*", {"labels": False}),
+                                 ("dijkstra", {"labels": False, "heuristic": False})]:
+                    times = []
+                    for s, t in sample:
+                        t0 = time.perf_counter()
+                        got = shortest_path(graph, s, t, weight, mask, **kw)
+                        times.append(time.perf_counter() - t0)
+                        if mode == "hub labels":
+                            check_route(graph, s, t, weight, mask, got)
+                    timings[mode] = np.percentile(times, [50, 99]) * 1e3
+                print(f"{name:<8} {weight:<8} load {t_load * 1e3:5.1f} ms, {per_entry:4.1f} hubs/label | "
+                      + "  ".join(f"{m} p50 {p50:6.3f} ms p99 {p99:6.3f} ms" for m, (p50, p99) in timings.items()))
+    print(f"all {pairs * len(views) * len(WEIGHTS)} cache queries match plain Dijkstra")
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Time hub-label routes against A* and Dijkstra on the cache.")
+    ap.add_argument("--pairs", type=int, default=500)
+    ap.add_argument("--seed", type=int, default=11)
+    args = ap.parse_args(argv)
+    bench_cache(args.pairs, args.seed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from datalogging import build_nodes_from_edges
+
+CARRIERS = ["--","9K","AA","AS","B6","DL","F9","G4","HA","MX","NK","SY","UA","WN","XP"]
+
+
+def synthetic_edges(n_edges: int, n_airports: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    airports = np.array([f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}"
+                         for i in range(n_airports)])
+    # hub-heavy degree distribution, like the real network
+    p = 1.0 / np.arange(1, n_airports + 1) ** 0.8
+    p /= p.sum()
+    o = rng.choice(airports, n_edges, p=p)
+    d = rng.choice(airports, n_edges, p=p)
+    n_car = rng.integers(1, 5, n_edges)
+    carriers = [",".join(sorted(rng.choice(CARRIERS, k, replace=False))) for k in n_car]
+    primary = [c.split(",")[rng.integers(0, k)] for c, k in zip(carriers, n_car)]
+    return pd.DataFrame({
+        "Origin": o, "Dest": d,
+        "quarter_tag": rng.choice(["2025_Q1","2025_Q2"], n_edges),
+        "wavg_itin_fare_usd": rng.uniform(50, 900, n_edges),
+        "avg_distance_miles": rng.integers(50, 3000, n_edges).astype(float),
+        "delay_rate": np.where(rng.random(n_edges) < 0.4, np.nan, rng.random(n_edges)),
+        "carriers": carriers, "primary_carrier": primary,
+    })
+
+
+def legacy_build_nodes_from_edges(edges: pd.DataFrame) -> pd.DataFrame:
+    # the row-wise builder this benchmark replaced, kept as the reference result
+
+    origins = edges[["Origin"]].rename(columns={"Origin":"Airport"})
+    dests   = edges[["Dest"]].rename(columns={"Dest":"Airport"})
+    airports = pd.concat([origins, dests], axis=0).dropna().drop_duplicates().reset_index(drop=True)
+
+    def explode_carriers(df, col_air):
+        df2 = df[[col_air, "carriers","primary_carrier"]].copy()
+        lst = []
+        for _, r in df2.iterrows():
+            items = []
+            if isinstance(r.get("carriers"), str) and r["carriers"].strip():
+                items.extend([x.strip() for x in r["carriers"].split(",") if x.strip()])
+            pc = r.get("primary_carrier")
+            if isinstance(pc, str) and pc.strip():
+                items.append(pc.strip())
+            items = sorted(set(items))
+            lst.append(items)
+        df2["carrier_list"] = lst
+        return df2
+
+    out_car = explode_carriers(edges.rename(columns={"Origin":"Airport"}), "Airport")
+    in_car  = explode_carriers(edges.rename(columns={"Dest":"Airport"}), "Airport")
+
+    def union_lists(series):
+        s = set()
+        for lst in series:
+            s |= set(lst or [])
+        return sorted(s)
+
+    out_car_g = (out_car.groupby("Airport")["carrier_list"]
+                      .apply(union_lists).reset_index().rename(columns={"carrier_list":"carriers_out"}))
+    in_car_g  = (in_car.groupby("Airport")["carrier_list"]
+                      .apply(union_lists).reset_index().rename(columns={"carrier_list":"carriers_in"}))
+
+    node_df = airports.merge(out_car_g, on="Airport", how="left").merge(in_car_g, on="Airport", how="left")
+    node_df["carriers_out"] = node_df["carriers_out"].apply(lambda x: x if isinstance(x, list) else [])
+    node_df["carriers_in"]  = node_df["carriers_in"].apply(lambda x: x if isinstance(x, list) else [])
+    node_df["carriers_serving"] = node_df.apply(lambda r: sorted(set(r["carriers_out"]) | set(r["carriers_in"])), axis=1)
+
+    def top3_for_airport(ap):
+        mask = (edges["Origin"] == ap) | (edges["Dest"] == ap)
+        s = []
+        for _, r in edges.loc[mask, ["carriers","primary_carrier"]].iterrows():
+            if isinstance(r["carriers"], str) and r["carriers"].strip():
+                s += [x.strip() for x in r["carriers"].split(",") if x.strip()]
+            if isinstance(r["primary_carrier"], str) and r["primary_carrier"].strip():
+                s.append(r["primary_carrier"].strip())
+        if not s:
+            return []
+        counts = pd.Series(s).value_counts()
+        return counts.index.tolist()[:3]
+
+    node_df["top3_carriers"] = node_df["Airport"].apply(top3_for_airport)
+
+    deg_out = (edges.groupby("Origin")["Dest"].nunique().rename("deg_out")).reset_index().rename(columns={"Origin":"Airport"})
+    deg_in  = (edges.groupby("Dest")["Origin"].nunique().rename("deg_in")).reset_index().rename(columns={"Dest":"Airport"})
+    node_df = node_df.merge(deg_out, on="Airport", how="left").merge(deg_in, on="Airport", how="left")
+    node_df["deg_out"] = node_df["deg_out"].fillna(0).astype(int)
+    node_df["deg_in"]  = node_df["deg_in"].fillna(0).astype(int)
+    node_df["deg"]     = node_df["deg_out"] + node_df["deg_in"]
+
+    out_stats = (edges.groupby("Origin", as_index=False)
+                      .agg(avg_out_fare=("wavg_itin_fare_usd","mean"),
+                           avg_out_delay=("delay_rate","mean"),
+                           avg_out_distance=("avg_distance_miles","mean")))
+    out_stats = out_stats.rename(columns={"Origin":"Airport"})
+    node_df = node_df.merge(out_stats, on="Airport", how="left")
+
+    cols = [
+        "Airport","deg","deg_out","deg_in",
+        "carriers_serving","top3_carriers","carriers_out","carriers_in",
+        "avg_out_fare","avg_out_delay","avg_out_distance"
+    ]
+    for c in cols:
+        if c not in node_df.columns:
+            node_df[c] = np.nan
+    return node_df[cols].sort_values("Airport").reset_index(drop=True)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Benchmark build_nodes_from_edges on synthetic edges.")
+    ap.add_argument("--edges", type=int, default=100_000)
+    ap.add_argument("--airports", type=int, default=500)
+    ap.add_argument("--no-legacy", action="store_true", help="skip the (slow) row-wise reference run")
+    args = ap.parse_args(argv)
+
+    edges = synthetic_edges(args.edges, args.airports)
+    t0 = time.perf_counter()
+    nodes = build_nodes_from_edges(edges)
+    t_new = time.perf_counter() - t0
+    print(f"vectorized: {len(edges):,} edges -> {len(nodes)} nodes in {t_new:.3f} s")
+
+    if not args.no_legacy:
+        t0 = time.perf_counter()
+        ref = legacy_build_nodes_from_edges(edges)
+        t_old = time.perf_counter() - t0
+        pd.testing.assert_frame_equal(nodes, ref)
+        print(f"row-wise:   {t_old:.3f} s  (speedup {t_old / t_new:.1f}x, identical output)")
+
+if __name__ == "__main__":
+    main()
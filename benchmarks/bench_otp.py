@@ -0,0 +1,108 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import datalogging
+from datalogging import quarter_from_year_month, safe_read_csv
+
+CARRIERS = ["--","9K","AA","AS","B6","DL","F9","G4","HA","MX","NK","SY","UA","WN","XP"]
+
+
+def synthetic_flights(n_rows: int, n_airports: int, path: Path, seed: int = 0):
+    # the 2022-2025 flights file layout, with the blanks the real one has
+    rng = np.random.default_rng(seed)
+    airports = np.array([f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}"
+                         for i in range(n_airports)])
+    p = 1.0 / np.arange(1, n_airports + 1) ** 0.8
+    p /= p.sum()
+    days = pd.date_range("2022-01-01", "2025-06-30").strftime("%Y-%m-%d").to_numpy()
+    dates = rng.choice(days, n_rows).astype(object)
+    dates[rng.random(n_rows) < 0.001] = None
+    delay = rng.normal(5, 35, n_rows).round()
+    delay[rng.random(n_rows) < 0.02] = np.nan
+    pd.DataFrame({
+        "Date": dates, "Carrier": rng.choice(CARRIERS, n_rows),
+        "Origin": rng.choice(airports, n_rows, p=p), "Dest": rng.choice(airports, n_rows, p=p),
+        "Delay": delay, "Cancelled": (rng.random(n_rows) < 0.02).astype(int),
+    }).to_csv(path, index=False)
+
+
+def legacy_load_flights_delay(path: Path) -> pd.DataFrame:
+    # the whole-file aggregation this benchmark replaced, kept as the reference result
+
+    use = ["Date","Carrier","Origin","Dest","Delay","Cancelled"]
+    f = safe_read_csv(path, use)
+    # parse date
+    dt = pd.to_datetime(f["Date"], errors="coerce")
+    f["Year"] = dt.dt.year
+    f["Month"] = dt.dt.month
+    f["quarter_tag"] = [quarter_from_year_month(y, m) if pd.notna(y) and pd.notna(m) else None
+                        for y, m in zip(f["Year"], f["Month"])]
+    f = f.dropna(subset=["Origin","Dest","quarter_tag"])
+
+    f["is_delayed"] = (f["Delay"].fillna(0) > 0).astype(int)
+    f["is_cancelled"] = f["Cancelled"].fillna(0).astype(int)
+    f["is_bad"] = ((f["is_delayed"] == 1) | (f["is_cancelled"] == 1)).astype(int)
+
+    agg = (f.groupby(["Origin","Dest","quarter_tag"], as_index=False)
+             .agg(flights=("is_bad","size"),
+                  bad=("is_bad","sum"),
+                  avg_delay=("Delay", lambda s: pd.to_numeric(s, errors="coerce").clip(lower=0).mean())))
+    agg["delay_rate"] = (agg["bad"] / agg["flights"]).replace([np.inf, -np.inf], np.nan)
+    return agg
+
+
+def check_same(got: pd.DataFrame, want: pd.DataFrame):
+    got = got.reset_index(drop=True)
+    want = want.reset_index(drop=True)
+    assert len(got) == len(want), (len(got), len(want))
+    for c in ["Origin","Dest","quarter_tag"]:
+        assert (got[c].astype(str).to_numpy() == want[c].astype(str).to_numpy()).all(), c
+    for c in ["flights","bad"]:
+        assert (got[c].to_numpy() == want[c].to_numpy()).all(), c
+    for c in ["avg_delay","delay_rate"]:
+        assert np.allclose(got[c], want[c], rtol=1e-12, atol=0, equal_nan=True), c
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Time the OTP aggregation stage against the whole-file version.")
+    ap.add_argument("--rows", type=int, nargs="+", default=[200_000, 2_000_000])
+    ap.add_argument("--airports", type=int, default=400)
+    ap.add_argument("--chunksize", type=int, default=1_000_000)
+    ap.add_argument("--skip-legacy-above", type=int, default=500_000,
+                    help="the per-group lambda takes minutes past this; only time the streaming version")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "flights.csv"
+        for n in args.rows:
+            synthetic_flights(n, args.airports, path)
+            datalogging.FLIGHTS_CSV = path
+            t0 = time.perf_counter()
+            got = datalogging.load_flights_delay_2022_2025(chunksize=args.chunksize)
+            t_new = time.perf_counter() - t0
+            # DB1B covers one quarter, so only it is aggregated in a real build
+            t0 = time.perf_counter()
+            one = datalogging.load_flights_delay_2022_2025({"2025_Q1"}, chunksize=args.chunksize)
+            t_one = time.perf_counter() - t0
+            line = (f"{n:>11,} rows: streaming {n / t_new:12,.0f} rows/s ({t_new:6.2f} s)   "
+                    f"one-quarter filter {n / t_one:12,.0f} rows/s ({t_one:6.2f} s)")
+            if n <= args.skip_legacy_above:
+                t0 = time.perf_counter()
+                want = legacy_load_flights_delay(path)
+                t_old = time.perf_counter() - t0
+                check_same(got, want)
+                check_same(one, want[want["quarter_tag"] == "2025_Q1"])
+                line += f"   legacy {n / t_old:10,.0f} rows/s ({t_old:6.2f} s, {t_old / t_new:.1f}x)"
+            print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import os
+import platform
+import sys
+import time
+import numpy as np
+import networkx as nx
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from checks import random_edges
+from colcache import read_cache, resolve_cache
+from paths import pareto_paths
+from routegraph import RouteGraph, WEIGHTS
+
+
+def brute_frontier(G: nx.DiGraph, s: str, t: str, weights: tuple[str, ...], max_stops: int) -> set[tuple]:
+    vecs = {tuple(round(nx.path_weight(G, p, w), 9) for w in weights)
+            for p in nx.all_simple_paths(G, s, t, cutoff=max_stops + 1)}
+    return {v for v in vecs if not any(o != v and all(a <= b for a, b in zip(o, v)) for o in vecs)}
+
+def check_equivalence(trials: int, seed: int):
+    rng = np.random.default_rng(seed)
+    checked = 0
+    for trial in range(trials):
+        graph = RouteGraph.from_edges(random_edges(int(rng.integers(8, 30)), int(rng.integers(20, 150)), rng))
+        mask = graph.filter_mask(max_delay=0.7) if trial % 2 else None
+        view = graph.view(mask)
+        G = view.to_networkx()
+        for _ in range(5):
+            s, t = rng.choice(graph.airports, 2, replace=False)
+            if s not in G or t not in G:
+                continue
+            n = int(rng.integers(2, len(WEIGHTS) + 1))
+            weights = tuple(rng.choice(WEIGHTS, n, replace=False))
+            max_stops = int(rng.integers(0, 4))
+            got = pareto_paths(graph, s, t, weights, mask=mask, max_stops=max_stops)
+            for p, costs in got:
+                assert len(set(p)) == len(p) and len(p) - 2 <= max_stops
+                assert np.allclose(costs, [view.route_cost(p, w) for w in weights])
+            got_vecs = {tuple(round(c, 9) for c in costs) for _, costs in got}
+            assert len(got_vecs) == len(got)
+            want = brute_frontier(G, s, t, weights, max_stops)
+            assert got_vecs == want, (s, t, weights, max_stops, got_vecs, want)
+            checked += 1
+    print(f"equivalence: {checked} random queries match the brute-force Pareto frontier")
+
+def bench_pairs(pairs: int, seed: int, budget_ms: float):
+    edges = read_cache(resolve_cache(ROOT / "cache", "edges_min_2025"))
+    graph = RouteGraph.from_edges(edges)
+    mask = graph.filter_mask((0, 800), 0.4)
+    rng = np.random.default_rng(seed)
+    deg = graph.view(mask).degree().sort_values(ascending=False)
+    hubs, rest = deg.index[:30].to_numpy(), deg.index[30:].to_numpy()
+    sample = [(rng.choice(hubs), rng.choice(rest if i % 2 else hubs)) for i in range(pairs)]
+    sample = [(s, t) for s, t in sample if s != t]
+
+    # latencies depend on the machine; say which one they are from
+    print(f"{len(sample)} pairs on {platform.platform()}, {os.cpu_count()} cpu(s), "
+          f"Python {platform.python_version()}")
+    for weights in [("fare", "co2"), ("fare", "co2", "delay"), WEIGHTS]:
+        for max_stops in (1, 2, 3):
+            times, sizes = [], []
+            for s, t in sample:
+                t0 = time.perf_counter()
+                sizes.append(len(pareto_paths(graph, s, t, weights, mask=mask, max_stops=max_stops)))
+                times.append((time.perf_counter() - t0) * 1e3)
+            p50, p95, worst = np.percentile(times, [50, 95, 100])
+            flag = "" if p95 <= budget_ms else f"  over the {budget_ms:.0f} ms budget"
+            print(f"{'/'.join(weights):<26} stops<={max_stops}: p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  "
+                  f"max {worst:6.1f} ms  frontier avg {np.mean(sizes):5.1f}{flag}")
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Check and time the Pareto route search.")
+    ap.add_argument("--trials", type=int, default=200)
+    ap.add_argument("--pairs", type=int, default=40)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--budget-ms", type=float, default=250.0, help="interactive latency budget for p95")
+    args = ap.parse_args(argv)
+    check_equivalence(args.trials, args.seed)
+    bench_pairs(args.pairs, args.seed, args.budget_ms)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import time
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests"))
+
+from checks import nx_costs
+from colcache import read_cache, resolve_cache
+from paths import k_shortest_paths
+from routegraph import RouteGraph, WEIGHTS
+
+
+def bench_pairs(pairs: int, k: int, seed: int):
+    edges = read_cache(resolve_cache(ROOT / "cache", "edges_min_2025"))
+    graph = RouteGraph.from_edges(edges)
+    mask = graph.filter_mask((0, 800), 0.4)
+    G = graph.view(mask).to_networkx()
+    rng = np.random.default_rng(seed)
+    # hub-to-regional pairs are the slow case for Yen's, so draw origins from the top hubs
+    deg = graph.view(mask).degree().sort_values(ascending=False)
+    hubs, rest = deg.index[:30].to_numpy(), deg.index[30:].to_numpy()
+    sample = [(rng.choice(hubs), rng.choice(rest)) for _ in range(pairs)]
+
+    for weight in WEIGHTS:
+        t0 = time.perf_counter()
+        for s, t in sample:
+            nx_costs(G, s, t, weight, k, None)
+        t_nx = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for s, t in sample:
+            k_shortest_paths(graph, s, t, weight, k, mask=mask)
+        t_ours = time.perf_counter() - t0
+        print(f"{weight:<8} k={k}: networkx {t_nx / pairs * 1e3:8.1f} ms/query   "
+              f"csr {t_ours / pairs * 1e3:7.1f} ms/query   ({t_nx / t_ours:.1f}x)")
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Time the CSR k-shortest-paths engine against networkx.")
+    ap.add_argument("--pairs", type=int, default=20)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args(argv)
+    bench_pairs(args.pairs, args.k, args.seed)
+
+if __name__ == "__main__":
+    main()
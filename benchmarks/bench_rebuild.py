@@ -0,0 +1,83 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from datalogging import FLIGHTS_CSV, TICKET_CSV
+from synth import generate
+
+# datalogging.py on synthetic data: a full build, then rebuilds after no change, after
+# touching every input, after an OTP-only edit and after editing one DB1B quarter. The
+# last rebuild's cache files are checked against a from-scratch build of the same inputs.
+
+OUTPUTS = ["edges_2025.json", "edges_min_2025.json", "nodes_2025.json"]
+
+
+def build(workdir: Path, *flags: str) -> tuple[float, list[str]]:
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, str(ROOT / "datalogging.py"), *flags], cwd=workdir,
+                         env={**os.environ, "PYTHONPATH": str(ROOT)}, capture_output=True, text=True, check=True)
+    seconds = time.perf_counter() - t0
+    # what was redone, and the timing report's rows for the edge build and the hub labels after it
+    steps = [line.strip() for line in out.stdout.splitlines()
+             if line.startswith(("[DB1B] 20", "[OTP ] Loading", "[BUILD]", "wrote cache/edges_2025."))
+             or line.strip().startswith(("build_edges ", "hub_labels "))]
+    return seconds, steps
+
+def edit_csv(path: Path, column: str, fn):
+    df = pd.read_csv(path)
+    rows = slice(0, max(1, len(df) // 100))
+    df.loc[rows, column] = fn(df.loc[rows, column])
+    df.to_csv(path, index=False)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Time full and incremental cache rebuilds on synthetic data.")
+    ap.add_argument("--coupons", type=float, default=2e5, help="coupon rows per quarter")
+    ap.add_argument("--airports", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        info = generate(work, int(args.coupons), args.airports, quarters=["2025_1", "2025_2"], seed=args.seed)
+        data = work / "dataset"
+        print(f"{len(info['files'])} input files, {info['bytes'] / 1e6:.0f} MB")
+
+        def touch():
+            for f in data.iterdir():
+                f.touch()
+
+        scenarios = [
+            ("full build", None, ["--rebuild"]),
+            ("no change", None, []),
+            ("inputs touched", touch, []),
+            ("OTP edited", lambda: edit_csv(data / FLIGHTS_CSV.name, "Delay", lambda s: s.fillna(0) + 30), []),
+            ("one DB1B quarter edited", lambda: edit_csv(data / TICKET_CSV.name.replace("2025_1", "2025_2"),
+                                                         "ItinFare", lambda s: s * 1.5), []),
+        ]
+        for name, change, flags in scenarios:
+            if change is not None:
+                change()
+            seconds, steps = build(work, *flags)
+            print(f"{name:<24} {seconds:7.2f} s")
+            for step in steps:
+                print(f"    {step}")
+
+        incremental = {f: (work / "cache" / f).read_bytes() for f in OUTPUTS}
+        build(work, "--rebuild")
+        same = all((work / "cache" / f).read_bytes() == incremental[f] for f in OUTPUTS)
+        print("incremental cache files " + ("match" if same else "DIFFER from") + " a full rebuild")
+        if not same:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from startup import MANIFEST, write_manifest
+
+# Cold starts of app.py, each in a fresh interpreter: how long until the controls are on
+# screen (the app's first_render stage) and until the whole page is done, with and without
+# the startup manifest. Without it the app loads the cache and builds the graph first,
+# which is how every start used to go.
+
+COLD_START = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+import perf
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+t1 = time.perf_counter()
+at.run()
+done = time.perf_counter() - t1
+assert not at.exception, at.exception
+stages = perf.snapshot()["stages"]
+print(json.dumps({"first_render_ms": stages["first_render"][1] * 1e3, "page_ms": done * 1e3}))
+"""
+
+
+def cold_start(workdir: Path) -> dict:
+    out = subprocess.run([sys.executable, "-c", COLD_START, str(ROOT / "app.py")], cwd=workdir,
+                         env={**os.environ, "SKYPATH_PERF": "1", "PYTHONPATH": str(ROOT)}, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Time app.py's cold start with and without the startup manifest.")
+    ap.add_argument("--cache", type=Path, default=ROOT / "cache")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = Path(tmp) / "cache"
+        shutil.copytree(args.cache, cache, ignore=shutil.ignore_patterns(MANIFEST, "partitions"))
+        results = {}
+        for mode in ["no manifest", "manifest"]:
+            if mode == "manifest":
+                write_manifest(cache)
+            runs = [cold_start(Path(tmp)) for _ in range(args.repeat)]
+            results[mode] = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+            r = results[mode]
+            print(f"{mode:<12} controls on screen {r['first_render_ms']:8.1f} ms   "
+                  f"whole page {r['page_ms']:8.1f} ms   (median of {args.repeat})")
+        speedup = results["no manifest"]["first_render_ms"] / results["manifest"]["first_render_ms"]
+        print(f"time to first render: {speedup:.1f}x faster with the manifest")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+from __future__ import annotations
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from startup import METRICS
+
+# Drives a running route service (service.py) from `concurrency` keep-alive connections
+# and reports latency percentiles. A share of the requests repeats a small set of hot
+# queries, which is what the service's coalescing and response cache are for.
+
+
+async def get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str,
+              target: str) -> tuple[int, bytes]:
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def fetch_json(host: str, port: int, target: str) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return json.loads((await get(reader, writer, host, target))[1])
+    finally:
+        writer.close()
+
+def make_targets(meta: dict, n: int, duplicates: float, hot: int, pareto: float, seed: int) -> list[str]:
+    rng = np.random.default_rng(seed)
+    airports, quarters = meta["airports"], ["latest"] + meta["quarters"]
+    lo, hi = meta["default_price_range"]
+
+    def query() -> str:
+        s, t = rng.choice(airports, 2, replace=False)
+        q = {"origin": s, "dest": t, "price_min": lo, "price_max": hi, "quarter": str(rng.choice(quarters))}
+        if rng.random() < pareto:
+            return "/pareto?" + urlencode(q)
+        return "/routes?" + urlencode(dict(q, metric=str(rng.choice(list(METRICS.values()))), k=5))
+
+    hot_set = [query() for _ in range(hot)]
+    return [hot_set[rng.integers(hot)] if rng.random() < duplicates else query() for _ in range(n)]
+
+async def run(host: str, port: int, targets: list[str], concurrency: int) -> tuple[list[float], dict, float]:
+    todo = iter(targets)
+    latencies, statuses = [], {}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for target in todo:
+                t0 = time.perf_counter()
+                status, _ = await get(reader, writer, host, target)
+                latencies.append(time.perf_counter() - t0)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - t0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def spawn(cache: Path, workers: int | None) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    cmd = [sys.executable, str(ROOT / "service.py"), "--cache", str(cache), "--port", str(port)]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    proc.stdout.readline()      # "serving ..." once the engine is loaded and the port is open
+    return proc, f"http://127.0.0.1:{port}"
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Load-test the route service and report latency percentiles.")
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--spawn", action="store_true", help="start a service on a free port for the test")
+    ap.add_argument("--cache", type=Path, default=ROOT / "cache", help="with --spawn")
+    ap.add_argument("--workers", type=int, default=None, help="with --spawn")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--duplicates", type=float, default=0.5, help="share of requests from the hot set")
+    ap.add_argument("--hot", type=int, default=20, help="number of hot queries")
+    ap.add_argument("--pareto", type=float, default=0.1, help="share of Pareto requests")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    proc = None
+    if args.spawn:
+        proc, args.url = spawn(args.cache, args.workers)
+    try:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        meta = asyncio.run(fetch_json(host, port, "/meta"))
+        before = asyncio.run(fetch_json(host, port, "/stats"))
+        targets = make_targets(meta, args.requests, args.duplicates, args.hot, args.pareto, args.seed)
+        latencies, statuses, elapsed = asyncio.run(run(host, port, targets, args.concurrency))
+        after = asyncio.run(fetch_json(host, port, "/stats"))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1e3
+    hits = after["cache"]["hits"] - before["cache"]["hits"]
+    print(f"{len(latencies)} requests at concurrency {args.concurrency} on {after['workers']} worker(s) "
+          f"in {elapsed:.2f} s: {len(latencies) / elapsed:.1f} requests/s")
+    print(f"latency p50 {p50:.1f} ms  p90 {p90:.1f} ms  p99 {p99:.1f} ms  max {max(latencies) * 1e3:.1f} ms")
+    print(f"status {dict(sorted(statuses.items()))}; coalesced {after['coalesced'] - before['coalesced']}, "
+          f"response cache hits {hits}")
+
+if __name__ == "__main__":
+    main()
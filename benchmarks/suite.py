@@ -0,0 +1,180 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import datalogging
+import perf
+from colcache import write_cache
+from engine import load_edges_nodes
+from hublabels import HUB_LABELS, attach, build_hub_labels
+from paths import k_shortest_paths, pareto_paths, shortest_path
+from routegraph import RouteGraph, WEIGHTS
+from routetable import DEFAULT_MAX_DELAY, default_price_range
+from synth import generate
+
+# End-to-end benchmark on synthetic BTS data: generate, then build_edges_2025 (in-memory
+# and streaming), build_nodes_from_edges, cache write/load, graph construction and route
+# queries, one fresh process per scale so memory figures do not carry over. Every run
+# appends one JSON line per scale to the results file and is compared with the previous
+# run at the same scale.
+
+MIN_COLS = ["Origin","Dest","avg_distance_miles","wavg_itin_fare_usd",
+            "delay_rate","est_emissions_kgco2","quarter_tag","primary_carrier","passengers"]
+
+
+def rss_mb() -> float | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def in_child(fn, *args):
+    methods = mp.get_all_start_methods()
+    with mp.get_context("fork" if "fork" in methods else methods[0]).Pool(1) as pool:
+        return pool.apply(fn, args)
+
+def git_rev() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return out.stdout.strip() + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(workdir: str, coupon_rows: int, flight_rows: int, queries: int, seed: int) -> list[dict]:
+    # runs in a child; datalogging's paths are relative to the working directory
+    os.chdir(workdir)
+    stages = []
+
+    def record(name, seconds, rows, unit, rss_before):
+        rss = rss_mb()
+        stages.append({"stage": name, "seconds": round(seconds, 4), "rows": rows,
+                       "per_s": round(rows / seconds, 1) if seconds > 0 else None, "unit": unit,
+                       "rss_delta_mb": None if rss is None or rss_before is None else round(rss - rss_before, 1),
+                       "peak_rss_mb": perf.peak_rss_mb()})
+
+    def timed(name, rows, unit, fn):
+        rss_before = rss_mb()
+        t0 = time.perf_counter()
+        result = fn()
+        record(name, time.perf_counter() - t0, rows, unit, rss_before)
+        return result
+
+    # the streaming build first, so the in-memory build's high-water mark is its own
+    timed("build_edges_stream", coupon_rows + flight_rows, "rows",
+          lambda: datalogging.build_edges_2025(streaming=True, workers=1, rebuild=True))
+    edges = timed("build_edges", coupon_rows + flight_rows, "rows",
+                  lambda: datalogging.build_edges_2025(workers=1, rebuild=True))
+    nodes = timed("build_nodes", len(edges), "edges", lambda: datalogging.build_nodes_from_edges(edges))
+
+    cache = Path("cache")
+    for ext in (".json", ".col"):
+        def write(ext=ext):
+            write_cache(edges[MIN_COLS], cache / f"edges_min_2025{ext}")
+            write_cache(nodes, cache / f"nodes_2025{ext}")
+        timed(f"write_cache{ext}", len(edges), "edges", write)
+    # resolve_cache prefers .col; the JSON load is timed by hiding the columnar files
+    for ext in (".col", ".json"):
+        hidden = [cache / f"{stem}.col" for stem in ("edges_min_2025", "nodes_2025")] if ext == ".json" else []
+        for p in hidden:
+            p.rename(p.with_suffix(".col.off"))
+        loaded, _ = timed(f"load_cache{ext}", len(edges), "edges", lambda: load_edges_nodes(cache))
+        for p in hidden:
+            p.with_suffix(".col.off").rename(p)
+
+    graph = timed("build_graph", len(loaded), "edges", lambda: RouteGraph.from_edges(loaded))
+    mask = graph.filter_mask(default_price_range(loaded), DEFAULT_MAX_DELAY)
+    rng = np.random.default_rng(seed)
+    pairs = [tuple(rng.choice(graph.airports, 2, replace=False)) for _ in range(queries)]
+    weights = [WEIGHTS[i % len(WEIGHTS)] for i in range(queries)]
+
+    def run(search):
+        for (s, t), w in zip(pairs, weights):
+            search(s, t, w)
+    # landmarks are built once per graph and weight; keep that out of the per-query figure
+    timed("build_landmarks", len(WEIGHTS), "weights",
+          lambda: [shortest_path(graph, *pairs[0], w, mask) for w in WEIGHTS])
+    timed("query_shortest", queries, "queries",
+          lambda: run(lambda s, t, w: shortest_path(graph, s, t, w, mask, labels=False)))
+    timed("build_hub_labels", len(WEIGHTS), "weights",
+          lambda: build_hub_labels(graph, {"filtered": mask}, cache / HUB_LABELS.name))
+    attach(graph, cache / HUB_LABELS.name)
+    timed("query_hub_labels", queries, "queries", lambda: run(lambda s, t, w: shortest_path(graph, s, t, w, mask)))
+    timed("query_k3", queries, "queries", lambda: run(lambda s, t, w: k_shortest_paths(graph, s, t, w, 3, mask)))
+    timed("query_pareto", queries, "queries",
+          lambda: run(lambda s, t, w: pareto_paths(graph, s, t, WEIGHTS, mask, max_stops=2)))
+    return stages
+
+
+def previous_runs(path: Path) -> dict:
+    last = {}
+    if path.exists():
+        for line in path.read_text().splitlines():
+            if line.strip():
+                run = json.loads(line)
+                last[(run["coupons"], run["airports"], len(run["quarters"]))] = run
+    return last
+
+def print_table(run: dict, before: dict | None):
+    print(f"\n{run['coupons']:,} coupon rows/quarter x {len(run['quarters'])} quarter(s), "
+          f"{run['airports']} airports, {run['flights']:,} flights  (generated in {run['generate_s']:.1f} s)")
+    old = {s["stage"]: s for s in before["stages"]} if before else {}
+    for s in run["stages"]:
+        line = (f"  {s['stage']:<20} {s['seconds']:9.3f} s  {s['per_s'] or 0:14,.0f} {s['unit']}/s"
+                f"  peak {s['peak_rss_mb'] or 0:7.1f} MB  {s['rss_delta_mb'] or 0:+7.1f} MB")
+        if s["stage"] in old and s["per_s"] and old[s["stage"]]["per_s"]:
+            # throughput relative to the previous run at this scale; below 1 is a slowdown
+            line += f"  {s['per_s'] / old[s['stage']]['per_s']:5.2f}x vs {before['git_rev']}"
+        print(line)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Benchmark the preprocessing and query stages on synthetic data.")
+    ap.add_argument("--coupons", type=float, nargs="+", default=[10_000, 100_000, 1_000_000],
+                    help="coupon rows per quarter, one run per value")
+    ap.add_argument("--airports", type=int, default=300)
+    ap.add_argument("--quarters", nargs="+", default=["2025_1"])
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=ROOT / "benchmarks" / "results.jsonl",
+                    help="JSON-lines file the results are appended to")
+    args = ap.parse_args(argv)
+
+    meta = {"git_rev": git_rev(), "ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "numpy": np.__version__, "pandas": pd.__version__, "platform": platform.platform(),
+            "cpus": os.cpu_count()}
+    last = previous_runs(args.out)
+    for coupons in map(int, args.coupons):
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            info = in_child(generate, Path(tmp), coupons, args.airports, None, args.quarters, args.seed)
+            run = {**meta, "coupons": coupons, "airports": args.airports, "quarters": args.quarters,
+                   "flights": coupons, "queries": args.queries, "seed": args.seed,
+                   "input_mb": round(info["bytes"] / 2**20, 1), "generate_s": round(time.perf_counter() - t0, 2)}
+            run["stages"] = in_child(run_scale, tmp, coupons * len(args.quarters), coupons,
+                                     args.queries, args.seed)
+        print_table(run, last.get((coupons, args.airports, len(args.quarters))))
+        with open(args.out, "a") as f:
+            f.write(json.dumps(run) + "\n")
+    print(f"\nappended {len(args.coupons)} run(s) to {args.out}")
+
+if __name__ == "__main__":
+    main()
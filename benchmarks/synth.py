@@ -0,0 +1,150 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from datalogging import COUPON_CSV, FLIGHTS_CSV, TICKET_CSV
+
+# Synthetic BTS inputs in the layout datalogging.py reads: DB1B Coupon/Ticket pairs (one
+# per quarter, both sorted by ItinID as BTS ships them) and the 2022-2025 flights file.
+# Everything is drawn from one seeded generator, so a (scale, airports, seed) triple
+# always writes the same bytes.
+
+CARRIERS = np.array(["AA","AS","B6","DL","F9","G4","HA","MX","NK","SY","UA","WN","XP","--"])
+CARRIER_P = np.array([16, 6, 5, 17, 4, 3, 1, 1, 5, 2, 14, 20, 1, 5], dtype=float) / 100
+BLOCK = 1_000_000
+
+
+def airport_codes(n: int) -> np.ndarray:
+    return np.array([f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}" for i in range(n)])
+
+class Network:
+    # airports on a rough continental-US box with a hub-heavy popularity curve
+    def __init__(self, n_airports: int, rng: np.random.Generator):
+        self.codes = airport_codes(n_airports)
+        self.lat = np.radians(rng.uniform(25, 49, n_airports))
+        self.lon = np.radians(rng.uniform(-124, -67, n_airports))
+        p = 1.0 / np.arange(1, n_airports + 1) ** 0.9
+        self.p = p / p.sum()
+
+    def draw(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        return rng.choice(len(self.codes), n, p=self.p)
+
+    def miles(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        dlat, dlon = self.lat[b] - self.lat[a], self.lon[b] - self.lon[a]
+        h = np.sin(dlat / 2) ** 2 + np.cos(self.lat[a]) * np.cos(self.lat[b]) * np.sin(dlon / 2) ** 2
+        return np.round(3958.8 * 2 * np.arcsin(np.sqrt(h))).clip(min=30)
+
+def write_block(df: pd.DataFrame, path: Path, first: bool):
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+
+def write_db1b(net: Network, coupons: int, year: int, quarter: int, coupon_csv: Path, ticket_csv: Path,
+               rng: np.random.Generator):
+    # itineraries of 1-4 chained coupons; ItinIDs are YYYYQ + sequence, like the real ones
+    written, seq, first = 0, 0, True
+    while written < coupons:
+        remaining = coupons - written
+        legs = rng.choice([1, 2, 3, 4], max(1, min(BLOCK, remaining) // 2), p=[0.45, 0.35, 0.12, 0.08])
+        # whole itineraries only, so the file ends with exactly `coupons` rows
+        legs = legs[np.cumsum(legs) <= remaining]
+        if len(legs) == 0:
+            legs = np.array([remaining])
+        n_itin = len(legs)
+        itin = int(f"{year}{quarter}") * 10**9 + seq + np.arange(n_itin)
+        seq += n_itin
+
+        ids = np.repeat(itin, legs)
+        first_row = np.repeat(np.cumsum(legs) - legs, legs)
+        seq_num = np.arange(len(ids)) - first_row + 1
+        stops = net.draw(len(ids) + n_itin, rng)
+        # coupon i of an itinerary flies stop i -> stop i+1 of that itinerary
+        start = np.cumsum(legs + 1) - (legs + 1)
+        pos = np.repeat(start, legs) + seq_num - 1
+        o, d = stops[pos], stops[pos + 1]
+        same = o == d
+        d[same] = (d[same] + 1) % len(net.codes)
+        miles = net.miles(o, d)
+        carrier = rng.choice(CARRIERS, len(ids), p=CARRIER_P).astype(object)
+        carrier[rng.random(len(ids)) < 0.002] = None
+        write_block(pd.DataFrame({
+            "ItinID": ids, "MktID": ids * 10 + 1, "SeqNum": seq_num, "Coupons": np.repeat(legs, legs),
+            "Year": year, "Quarter": quarter, "Origin": net.codes[o], "Dest": net.codes[d],
+            "TkCarrier": carrier, "Distance": miles,
+        }), coupon_csv, first)
+
+        total = np.add.reduceat(miles, np.cumsum(legs) - legs)
+        pax = rng.choice([1, 1, 1, 1, 2, 2, 3, 4], n_itin).astype(float)
+        fare = np.round(rng.gamma(4.0, 0.04 * np.sqrt(total) + 15) + 0.08 * total, 2)
+        # a few tickets are missing, as unmatched coupons are in the real data
+        keep = rng.random(n_itin) >= 0.003
+        write_block(pd.DataFrame({
+            "ItinID": itin[keep], "Coupons": legs[keep], "Year": year, "Quarter": quarter,
+            "Passengers": pax[keep], "ItinFare": fare[keep], "Distance": total[keep],
+            "MilesFlown": total[keep],
+        }), ticket_csv, first)
+        written += int(legs.sum())
+        first = False
+
+def write_flights(net: Network, rows: int, path: Path, rng: np.random.Generator):
+    days = pd.date_range("2022-01-01", "2025-12-31").strftime("%Y-%m-%d").to_numpy()
+    written, first = 0, True
+    while written < rows:
+        n = min(BLOCK, rows - written)
+        o, d = net.draw(n, rng), net.draw(n, rng)
+        same = o == d
+        d[same] = (d[same] + 1) % len(net.codes)
+        delay = np.round(rng.normal(4, 38, n))
+        delay[rng.random(n) < 0.015] = np.nan
+        write_block(pd.DataFrame({
+            "Date": rng.choice(days, n), "Carrier": rng.choice(CARRIERS, n, p=CARRIER_P),
+            "Origin": net.codes[o], "Dest": net.codes[d], "Delay": delay,
+            "Cancelled": (rng.random(n) < 0.02).astype(int),
+        }), path, first)
+        written += n
+        first = False
+
+
+def generate(out: Path, coupons: int, airports: int = 300, flights: int | None = None,
+             quarters: list[str] | None = None, seed: int = 0) -> dict:
+    # writes <out>/dataset/...; coupons is per quarter ("2025_1" style, default just 2025_1)
+    rng = np.random.default_rng(seed)
+    net = Network(airports, rng)
+    data = out / "dataset"
+    data.mkdir(parents=True, exist_ok=True)
+    quarters = quarters or ["2025_1"]
+    files = []
+    for q in quarters:
+        year, quarter = (int(x) for x in q.split("_"))
+        coupon_csv = data / COUPON_CSV.name.replace("2025_1", q)
+        ticket_csv = data / TICKET_CSV.name.replace("2025_1", q)
+        write_db1b(net, coupons, year, quarter, coupon_csv, ticket_csv, rng)
+        files += [coupon_csv, ticket_csv]
+    flights_csv = data / FLIGHTS_CSV.name
+    write_flights(net, coupons if flights is None else flights, flights_csv, rng)
+    files.append(flights_csv)
+    return {"files": [str(f) for f in files], "bytes": sum(f.stat().st_size for f in files)}
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Write synthetic DB1B Coupon/Ticket and OTP flights CSVs.")
+    ap.add_argument("out", type=Path, help="directory to create dataset/ in (run datalogging.py from there)")
+    ap.add_argument("--coupons", type=float, default=100_000, help="coupon rows per quarter (10k to 100M)")
+    ap.add_argument("--airports", type=int, default=300)
+    ap.add_argument("--flights", type=float, default=None, help="flights rows (default: same as --coupons)")
+    ap.add_argument("--quarters", nargs="+", default=["2025_1"], help='DB1B file pairs to write, e.g. 2025_1 2025_2')
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    info = generate(args.out, int(args.coupons), args.airports,
+                    None if args.flights is None else int(args.flights), args.quarters, args.seed)
+    print(f"wrote {len(info['files'])} files, {info['bytes'] / 1e6:.1f} MB in {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable
+import hashlib
+import json
+import pandas as pd
+
+import perf
+from colcache import read_cache, write_cache
+
+# Bump when a build step changes what it computes from the same inputs: every stage key
+# includes it, so the next run recomputes everything once.
+BUILD_VERSION = 1
+HASH_BLOCK = 1 << 20
+
+
+def file_stamp(path: Path) -> list[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+def digest(obj) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+def frame_hash(df: pd.DataFrame) -> str:
+    h = hashlib.sha1(json.dumps([str(c) for c in df.columns]).encode())
+    try:
+        rows = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        # list columns (carrier sets) are not hashable as they are
+        rows = pd.util.hash_pandas_object(df.astype({c: str for c in df.columns if df[c].dtype == object}),
+                                          index=False)
+    h.update(rows.to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class Output:
+    # One frame a stage produced: its content hash now, the frame only when asked for.
+    def __init__(self, sha1: str, path: Path | None = None, frame: pd.DataFrame | None = None):
+        self.sha1 = sha1
+        self.path = path
+        self._frame = frame
+
+    def frame(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = read_cache(self.path, use_mmap=False, categorical=False)
+        return self._frame
+
+
+class BuildCache:
+    # The intermediate aggregates of a cache build, kept under `root` with a manifest of
+    # content hashes: per input file (reused while its size and mtime are unchanged), and
+    # per stage the hash of what it was computed from (its key) and of each frame it
+    # produced. A stage whose key is unchanged is skipped, and its frames are read back
+    # only if a later stage has to be recomputed. With root None nothing is kept.
+    def __init__(self, root: Path | None = None, rebuild: bool = False):
+        self.root = None if root is None else Path(root)
+        self.manifest = {"version": BUILD_VERSION, "inputs": {}, "stages": {}}
+        path = self.manifest_path
+        if path is not None and path.exists() and not rebuild:
+            saved = json.loads(path.read_text())
+            if saved.get("version") == BUILD_VERSION:
+                self.manifest = saved
+
+    @property
+    def manifest_path(self) -> Path | None:
+        return None if self.root is None else self.root / "manifest.json"
+
+    def input_hash(self, path: Path) -> str:
+        # content hash of an input file; rehashed only when its size or mtime changed
+        known = self.manifest["inputs"].get(str(path), {})
+        stamp = file_stamp(path)
+        if known.get("stamp") == stamp:
+            return known["sha1"]
+        with perf.stage("hash_inputs"):
+            h = hashlib.sha1()
+            with open(path, "rb") as f:
+                while block := f.read(HASH_BLOCK):
+                    h.update(block)
+        perf.count("input_bytes_hashed", stamp[0])
+        self.manifest["inputs"][str(path)] = {"stamp": stamp, "sha1": h.hexdigest()}
+        return h.hexdigest()
+
+    def stage(self, name: str, key: dict, compute: Callable[[], dict[str, pd.DataFrame]]) -> dict[str, Output]:
+        key = digest({"version": BUILD_VERSION, **key})
+        saved = self.manifest["stages"].get(name)
+        if self.root is not None and saved is not None and saved["key"] == key and all(
+                (self.root / f"{out}.col").exists() and file_stamp(self.root / f"{out}.col") == rec["stamp"]
+                for out, rec in saved["outputs"].items()):
+            perf.count("build_stages_reused")
+            print(f"[BUILD] {name}: inputs unchanged, reusing {', '.join(saved['outputs'])}")
+            return {out: Output(rec["sha1"], self.root / f"{out}.col") for out, rec in saved["outputs"].items()}
+
+        outputs, record = {}, {}
+        for out, df in compute().items():
+            sha1 = frame_hash(df)
+            if self.root is None:
+                outputs[out] = Output(sha1, frame=df)
+                continue
+            # later stages read the frame back from the file either way, so a rebuild that
+            # reuses this stage feeds them exactly the same data
+            path = self.root / f"{out}.col"
+            self.root.mkdir(parents=True, exist_ok=True)
+            write_cache(df, path)
+            outputs[out] = Output(sha1, path)
+            record[out] = {"sha1": sha1, "stamp": file_stamp(path)}
+        if self.root is not None:
+            self.manifest["stages"][name] = {"key": key, "outputs": record}
+        return outputs
+
+    def save(self):
+        if self.root is None:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True))
+        tmp.replace(self.manifest_path)
@@ -0,0 +1,156 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import mmap
+import struct
+import numpy as np
+import pandas as pd
+
+# Columnar cache file layout:
+#   MAGIC | uint64 header length | JSON header | padding | column buffers (each 64-byte aligned)
+# String columns are dictionary-encoded (codes + dictionary in the header), list-of-string
+# columns are stored as flat codes + offsets, numeric columns as raw fixed-width arrays.
+MAGIC = b"SKPCOL1\n"
+ALIGN = 64
+
+
+def _pad(n: int) -> int:
+    return (-n) % ALIGN
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    # same widths pandas picks for Categorical codes, so reads need no cast
+    if n_categories < np.iinfo(np.int8).max:
+        return np.dtype(np.int8)
+    if n_categories < np.iinfo(np.int16).max:
+        return np.dtype(np.int16)
+    return np.dtype(np.int32)
+
+def _is_list_column(s: pd.Series) -> bool:
+    if s.dtype != object:
+        return False
+    first = s.dropna()
+    return not first.empty and isinstance(first.iloc[0], (list, tuple))
+
+def _encode_column(s: pd.Series) -> tuple[dict, list[np.ndarray]]:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        return {"kind": "num"}, [s.to_numpy()]
+    if _is_list_column(s):
+        items = [list(x) if isinstance(x, (list, tuple)) else [] for x in s]
+        lengths = np.fromiter((len(x) for x in items), dtype=np.int64, count=len(items))
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        flat = pd.Series([str(v) for x in items for v in x], dtype=object)
+        codes, uniques = pd.factorize(flat, sort=True)
+        return ({"kind": "list", "dictionary": [str(u) for u in uniques]},
+                [codes.astype(_codes_dtype(len(uniques))), offsets])
+    codes, uniques = pd.factorize(s, sort=True)
+    return ({"kind": "dict", "dictionary": [str(u) for u in uniques]},
+            [codes.astype(_codes_dtype(len(uniques)))])
+
+
+def write_columnar(df: pd.DataFrame, path: Path):
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True)
+    columns, buffers = [], []
+    offset = 0
+    for name in df.columns:
+        meta, arrays = _encode_column(df[name])
+        meta["name"] = str(name)
+        meta["buffers"] = []
+        for a in arrays:
+            a = np.ascontiguousarray(a)
+            meta["buffers"].append({"dtype": a.dtype.str, "offset": offset, "count": int(a.size)})
+            buffers.append(a)
+            offset += a.nbytes + _pad(a.nbytes)
+        columns.append(meta)
+
+    header = json.dumps({"nrows": len(df), "columns": columns}).encode("utf-8")
+    start = len(MAGIC) + 8 + len(header)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * _pad(start))
+        for a in buffers:
+            f.write(a.tobytes())
+            f.write(b"\0" * _pad(a.nbytes))
+    tmp.replace(path)
+
+
+def read_columnar(path: Path, use_mmap: bool = True, categorical: bool = True) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if use_mmap else f.read()
+    if buf[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a SkyPath columnar cache file")
+    (hlen,) = struct.unpack_from("<Q", buf, len(MAGIC))
+    hstart = len(MAGIC) + 8
+    header = json.loads(bytes(buf[hstart:hstart + hlen]).decode("utf-8"))
+    body = hstart + hlen
+    body += _pad(body)
+
+    def array(b: dict) -> np.ndarray:
+        return np.frombuffer(buf, dtype=np.dtype(b["dtype"]), count=b["count"], offset=body + b["offset"])
+
+    data = {}
+    for col in header["columns"]:
+        arrays = [array(b) for b in col["buffers"]]
+        if col["kind"] == "num":
+            data[col["name"]] = arrays[0]
+        elif col["kind"] == "dict":
+            cat = pd.Categorical.from_codes(arrays[0], categories=col["dictionary"], validate=False)
+            data[col["name"]] = cat if categorical else pd.Series(cat).astype(str).where(cat.codes >= 0)
+        else:
+            dictionary = np.asarray(col["dictionary"], dtype=object)
+            codes, offsets = arrays
+            data[col["name"]] = [dictionary[codes[offsets[i]:offsets[i + 1]]].tolist()
+                                 for i in range(header["nrows"])]
+    return pd.DataFrame(data, copy=False)
+
+
+def write_json(df: pd.DataFrame, path: Path):
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True)
+    # written aside and renamed into place, so a reader never sees a partial file
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_json(tmp, orient="records")
+    tmp.replace(path)
+
+def read_json(path: Path, **_) -> pd.DataFrame:
+    return pd.read_json(path)
+
+
+FORMATS = {
+    ".col": (write_columnar, read_columnar),
+    ".json": (write_json, read_json),
+}
+
+def write_cache(df: pd.DataFrame, path: Path):
+    FORMATS[Path(path).suffix][0](df, path)
+
+def read_cache(path: Path, **kw) -> pd.DataFrame:
+    return FORMATS[Path(path).suffix][1](path, **kw)
+
+def resolve_cache(cache_dir: Path, stem: str) -> Path:
+    # first existing format in FORMATS order; JSON is the fallback for caches built before .col
+    for ext in FORMATS:
+        p = Path(cache_dir) / f"{stem}{ext}"
+        if p.exists():
+            return p
+    return Path(cache_dir) / f"{stem}.json"
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Convert cache files between formats (by extension).")
+    ap.add_argument("src", type=Path, nargs="+")
+    ap.add_argument("--to", choices=[e.lstrip(".") for e in FORMATS], default="col")
+    args = ap.parse_args(argv)
+    for src in args.src:
+        dst = src.with_suffix("." + args.to)
+        write_cache(read_cache(src), dst)
+        print(f"wrote {dst}")
+
+if __name__ == "__main__":
+    main()
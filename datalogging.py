@@ -1,18 +1,36 @@
 from __future__ import annotations
 from pathlib import Path
+import argparse
 import json
+import multiprocessing as mp
+import os
+import time
 import numpy as np
 import pandas as pd
+from buildcache import BuildCache, Output, file_stamp
+from colcache import read_cache, write_cache, write_json
+import hublabels
+import perf
+import routetable
+import startup
 
 ROOT = Path(".")
 DATA = ROOT / "dataset"
 CACHE = ROOT / "cache"
 CACHE.mkdir(exist_ok=True)
+ROUTE_TABLE_PATH = CACHE / routetable.ROUTE_TABLE.name
 
 COUPON_CSV = DATA / "Origin_and_Destination_Survey_DB1BCoupon_2025_1.csv"
 TICKET_CSV = DATA / "Origin_and_Destination_Survey_DB1BTicket_2025_1.csv"
 FLIGHTS_CSV = DATA / "Copy of U.S. Flights Data - 2022 to 2025 - Flight Dataset.csv"
 
+# BTS ships DB1B one quarter per file pair; every pair in DATA becomes one cache partition
+COUPON_GLOB = "Origin_and_Destination_Survey_DB1BCoupon_*.csv"
+PARTITIONS = CACHE / "partitions"
+PARTITION_MANIFEST = PARTITIONS / "manifest.json"
+# intermediate aggregates (DB1B routes, carrier sets, OTP) and the hashes they were built from
+BUILD = CACHE / "build"
+
 
 def quarter_from_year_month(year: int, month: int) -> str:
     q = (int(month) - 1) // 3 + 1
@@ -21,76 +39,296 @@ def quarter_from_year_month(year: int, month: int) -> str:
 def quarter_from_year_quarter(year: int, quarter: int) -> str:
     return f"{int(year)}_Q{int(quarter)}"
 
-def safe_read_csv(path: Path, usecols: list[str] | None = None) -> pd.DataFrame:
+def quarter_tags(year: pd.Series, quarter: pd.Series) -> pd.Series:
+    return year.astype(int).astype(str) + "_Q" + quarter.astype(int).astype(str)
+
+def safe_read_csv(path: Path, usecols: list[str] | None = None,
+                  dtype: dict[str, str] | None = None, chunksize: int | None = None):
     if not path.exists():
         raise FileNotFoundError(f"Missing required file: {path}")
+    keep = None
     if usecols is not None:
         head = pd.read_csv(path, nrows=0)
         keep = [c for c in usecols if c in head.columns]
-        return pd.read_csv(path, usecols=keep)
-    return pd.read_csv(path)
+    if dtype is not None and keep is not None:
+        dtype = {c: t for c, t in dtype.items() if c in keep}
+    return pd.read_csv(path, usecols=keep, dtype=dtype, chunksize=chunksize)
 
 
-def load_coupon_2025() -> pd.DataFrame:
+COUPON_COLS = ["ItinID","Origin","Dest","TkCarrier","Distance","Year","Quarter"]
+TICKET_COLS = ["ItinID","Passengers","ItinFare","Distance","MilesFlown"]
+ROUTE_KEYS = ["Origin","Dest","quarter_tag"]
 
-    use = [
-        "ItinID","Origin","Dest","TkCarrier","Distance",
-        "Year","Quarter"
-    ]
-    df = safe_read_csv(COUPON_CSV, use)
+# compact dtypes for the streaming reader; ItinIDs are 12-digit (YYYYQ + seq) so they need int64,
+# and fares stay float64 so fare x pax sums match the in-memory build exactly
+COUPON_DTYPES = {
+    "ItinID": "int64", "Origin": "category", "Dest": "category", "TkCarrier": "category",
+    "Distance": "float32", "Year": "int16", "Quarter": "int8",
+}
+TICKET_DTYPES = {
+    "ItinID": "int64", "Passengers": "float32", "ItinFare": "float64",
+    "Distance": "float32", "MilesFlown": "float32",
+}
+
+
+def clean_coupon(df: pd.DataFrame) -> pd.DataFrame:
     for c in ["Origin","Dest","TkCarrier"]:
         if c in df.columns:
             df[c] = df[c].astype(str).str.strip()
-    df["quarter_tag"] = df.apply(
-        lambda r: quarter_from_year_quarter(r["Year"], r["Quarter"]), axis=1
-    )
+    df["quarter_tag"] = quarter_tags(df["Year"], df["Quarter"])
     return df
 
-def load_ticket_2025() -> pd.DataFrame:
-
-    use = ["ItinID","Passengers","ItinFare","Distance","MilesFlown"]
-    t = safe_read_csv(TICKET_CSV, use)
+def clean_ticket(t: pd.DataFrame) -> pd.DataFrame:
     if "Distance" not in t.columns and "MilesFlown" in t.columns:
         t = t.rename(columns={"MilesFlown":"Distance"})
     return t
 
-def load_flights_delay_2022_2025() -> pd.DataFrame:
-
-    use = ["Date","Carrier","Origin","Dest","Delay","Cancelled"]
-    f = safe_read_csv(FLIGHTS_CSV, use)
-    # parse date
-    dt = pd.to_datetime(f["Date"], errors="coerce")
-    f["Year"] = dt.dt.year
-    f["Month"] = dt.dt.month
-    f["quarter_tag"] = [quarter_from_year_month(y, m) if pd.notna(y) and pd.notna(m) else None
-                        for y, m in zip(f["Year"], f["Month"])]
-    f = f.dropna(subset=["Origin","Dest","quarter_tag"])
-
-    f["is_delayed"] = (f["Delay"].fillna(0) > 0).astype(int)
-    f["is_cancelled"] = f["Cancelled"].fillna(0).astype(int)
-    f["is_bad"] = ((f["is_delayed"] == 1) | (f["is_cancelled"] == 1)).astype(int)
-
-    agg = (f.groupby(["Origin","Dest","quarter_tag"], as_index=False)
-             .agg(flights=("is_bad","size"),
-                  bad=("is_bad","sum"),
-                  avg_delay=("Delay", lambda s: pd.to_numeric(s, errors="coerce").clip(lower=0).mean())))
-    agg["delay_rate"] = (agg["bad"] / agg["flights"]).replace([np.inf, -np.inf], np.nan)
-    return agg
-
 
-def build_edges_2025() -> pd.DataFrame:
-    c = load_coupon_2025()
-    t = load_ticket_2025()
+def load_coupon_2025(path: Path = COUPON_CSV) -> pd.DataFrame:
+
+    return clean_coupon(safe_read_csv(path, COUPON_COLS))
+
+def load_ticket_2025(path: Path = TICKET_CSV) -> pd.DataFrame:
+
+    return clean_ticket(safe_read_csv(path, TICKET_COLS))
+
+
+def iter_coupon_ticket_chunks(chunksize: int, coupon_csv: Path = COUPON_CSV, ticket_csv: Path = TICKET_CSV):
+    # sort-merge join of the two DB1B files; BTS ships both ordered by ItinID, so only the
+    # tickets overlapping the current coupon chunk are ever held in memory
+    coupons = safe_read_csv(coupon_csv, COUPON_COLS, COUPON_DTYPES, chunksize)
+    tickets = iter(safe_read_csv(ticket_csv, TICKET_COLS, TICKET_DTYPES, chunksize))
+    pending = None
+    exhausted = False
+    last_hi = None
+    for c in coupons:
+        if c.empty:
+            continue
+        lo, hi = c["ItinID"].iloc[0], c["ItinID"].iloc[-1]
+        if not c["ItinID"].is_monotonic_increasing or (last_hi is not None and lo < last_hi):
+            raise ValueError(f"{coupon_csv.name} is not sorted by ItinID; use the in-memory build")
+        last_hi = hi
+        while not exhausted and (pending is None or pending.empty or pending["ItinID"].iloc[-1] < hi):
+            try:
+                t = clean_ticket(next(tickets))
+            except StopIteration:
+                exhausted = True
+                break
+            if pending is not None:
+                t = pd.concat([pending, t], ignore_index=True)
+            if not t["ItinID"].is_monotonic_increasing:
+                raise ValueError(f"{ticket_csv.name} is not sorted by ItinID; use the in-memory build")
+            pending = t
+        if pending is None:
+            pending = pd.DataFrame({"ItinID": pd.Series(dtype="int64"),
+                                    "Passengers": pd.Series(dtype="float32"),
+                                    "ItinFare": pd.Series(dtype="float64")})
+        # an itinerary's coupons can straddle two chunks, so its ticket stays pending
+        part = pending[pending["ItinID"] <= hi]
+        pending = pending[pending["ItinID"] >= hi]
+        if "Distance" in c.columns:
+            part = part.drop(columns=["Distance"], errors="ignore")
+        yield clean_coupon(c).merge(part, on="ItinID", how="left")
+
+
+def fold_sums(acc: pd.DataFrame | None, part: pd.DataFrame, keys: list[str]) -> pd.DataFrame:
+    if acc is None:
+        return part
+    return pd.concat([acc, part], ignore_index=True).groupby(keys, as_index=False, sort=False).sum()
+
+ROUTE_SUMS = ["passengers","fare_num","dist_sum","dist_n"]
+
+def route_sums(m: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # additive per-route aggregates of a merged coupon/ticket frame, so chunks and
+    # partitions can be folded together before the averages are taken
+    m["fare_x_pax"] = pd.to_numeric(m["ItinFare"], errors="coerce") * pd.to_numeric(m["Passengers"], errors="coerce")
+    routes = (m.groupby(ROUTE_KEYS, as_index=False)
+                .agg(passengers=("Passengers","sum"),
+                     fare_num=("fare_x_pax","sum"),
+                     dist_sum=("Distance","sum"),
+                     dist_n=("Distance","count")))
+    cpax = (m.dropna(subset=["TkCarrier"])
+              .groupby(ROUTE_KEYS + ["TkCarrier"], as_index=False)["Passengers"].sum())
+    return routes, cpax
+
+def stream_db1b_sums(chunksize: int = 500_000, coupon_csv: Path = COUPON_CSV,
+                     ticket_csv: Path = TICKET_CSV) -> tuple[pd.DataFrame, pd.DataFrame]:
+    routes = None
+    cpax = None
+    for m in iter_coupon_ticket_chunks(chunksize, coupon_csv, ticket_csv):
+        # accumulate in float64 whatever the on-disk dtype
+        m["Passengers"] = m["Passengers"].astype("float64")
+        m["Distance"] = m["Distance"].astype("float64")
+        part_routes, part_cpax = route_sums(m)
+        routes = fold_sums(routes, part_routes, ROUTE_KEYS)
+        cpax = fold_sums(cpax, part_cpax, ROUTE_KEYS + ["TkCarrier"])
+
+    if routes is None:
+        routes = pd.DataFrame(columns=ROUTE_KEYS + ROUTE_SUMS)
+    if cpax is None:
+        cpax = pd.DataFrame(columns=ROUTE_KEYS + ["TkCarrier","Passengers"])
+    return routes, cpax
+
+def db1b_sums(coupon_csv: Path = COUPON_CSV, ticket_csv: Path = TICKET_CSV) -> tuple[pd.DataFrame, pd.DataFrame]:
+    c = load_coupon_2025(coupon_csv)
+    t = load_ticket_2025(ticket_csv)
     m = c.merge(t, on="ItinID", how="left", suffixes=("", "_t"))
+    return route_sums(m)
+
+def finish_db1b(routes: pd.DataFrame, cpax: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    # route sums -> (agg_db1b, per-carrier passengers, carriers list per route)
+    routes = routes.sort_values(ROUTE_KEYS).reset_index(drop=True)
+    routes["coupon_avg_miles"] = (routes["dist_sum"] / routes["dist_n"]).where(routes["dist_n"] > 0)
+    agg_db1b = routes.drop(columns=["dist_sum","dist_n"])
+    cpax = cpax.sort_values(ROUTE_KEYS + ["TkCarrier"]).reset_index(drop=True)
+    carriers = (cpax.groupby(ROUTE_KEYS)["TkCarrier"].agg(",".join)
+                    .reset_index()
+                    .rename(columns={"TkCarrier":"carriers"}))
+    carriers = agg_db1b[ROUTE_KEYS].merge(carriers, on=ROUTE_KEYS, how="left")
+    carriers["carriers"] = carriers["carriers"].fillna("")
+    return agg_db1b, cpax, carriers
+
+
+def db1b_sources() -> dict[str, tuple[Path, Path]]:
+    # partition key ("2025_1") -> (coupon csv, ticket csv)
+    sources = {}
+    for coupon in sorted(DATA.glob(COUPON_GLOB)):
+        key = coupon.stem.rsplit("DB1BCoupon_", 1)[1]
+        sources[key] = (coupon, coupon.with_name(coupon.name.replace("DB1BCoupon", "DB1BTicket")))
+    if not sources:
+        raise FileNotFoundError(f"Missing required file: {COUPON_CSV}")
+    return sources
+
+def partition_paths(key: str) -> tuple[Path, Path]:
+    return PARTITIONS / f"db1b_{key}_routes.col", PARTITIONS / f"db1b_{key}_cpax.col"
+
+def build_partition(job: tuple[str, Path, Path, bool, int]) -> tuple[str, list[str], float]:
+    # runs in a pool worker; writes the partition itself so only its summary crosses back
+    key, coupon_csv, ticket_csv, streaming, chunksize = job
+    t0 = time.perf_counter()
+    if not ticket_csv.exists():
+        raise FileNotFoundError(f"Missing required file: {ticket_csv}")
+    if streaming:
+        routes, cpax = stream_db1b_sums(chunksize, coupon_csv, ticket_csv)
+    else:
+        routes, cpax = db1b_sums(coupon_csv, ticket_csv)
+    routes_path, cpax_path = partition_paths(key)
+    write_cache(routes[ROUTE_KEYS + ROUTE_SUMS].reset_index(drop=True), routes_path)
+    write_cache(cpax[ROUTE_KEYS + ["TkCarrier","Passengers"]].reset_index(drop=True), cpax_path)
+    quarters = sorted(routes["quarter_tag"].dropna().astype(str).unique())
+    return key, quarters, time.perf_counter() - t0
+
+def read_manifest() -> dict:
+    if not PARTITION_MANIFEST.exists():
+        return {}
+    return json.loads(PARTITION_MANIFEST.read_text())
+
+def update_partitions(streaming: bool = False, chunksize: int = 500_000, workers: int | None = None,
+                      rebuild: bool = False, build: BuildCache | None = None) -> dict:
+    # (re)builds the partitions whose source files' contents changed, the stale ones in
+    # parallel, and drops partitions whose files are gone; returns the manifest
+    PARTITIONS.mkdir(parents=True, exist_ok=True)
+    build = build or BuildCache()
+    sources = db1b_sources()
+    manifest = {} if rebuild else read_manifest()
+    for key in set(manifest) - set(sources):
+        for path in partition_paths(key):
+            path.unlink(missing_ok=True)
+        del manifest[key]
+
+    def hashes(key):
+        coupon, ticket = sources[key]
+        return {"coupon": build.input_hash(coupon), "ticket": build.input_hash(ticket) if ticket.exists() else None}
+
+    stale = [k for k in sorted(sources)
+             if manifest.get(k, {}).get("hashes") != hashes(k)
+             or not all(p.exists() for p in partition_paths(k))]
+    for key in sorted(set(sources) - set(stale)):
+        print(f"[DB1B] {key}: unchanged, reusing partition ({', '.join(manifest[key]['quarters'])})")
+
+    jobs = [(k, sources[k][0], sources[k][1], streaming, chunksize) for k in stale]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    if workers == 1:
+        done = [build_partition(j) for j in jobs]
+    else:
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("fork" if "fork" in methods else methods[0])
+        with ctx.Pool(workers) as pool:
+            done = pool.map(build_partition, jobs)
+    perf.count("db1b_partitions_built", len(done))
+    for key, quarters, seconds in done:
+        manifest[key] = {"hashes": hashes(key), "quarters": quarters}
+        print(f"[DB1B] {key}: built partition ({', '.join(quarters)}) in {seconds:.1f} s")
+
+    tmp = PARTITION_MANIFEST.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(PARTITION_MANIFEST)
+    return manifest
+
+def merge_partitions(keys: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    routes = [read_cache(partition_paths(k)[0], use_mmap=False, categorical=False) for k in keys]
+    cpax = [read_cache(partition_paths(k)[1], use_mmap=False, categorical=False) for k in keys]
+    routes = pd.concat(routes, ignore_index=True) if routes else pd.DataFrame(columns=ROUTE_KEYS + ROUTE_SUMS)
+    cpax = pd.concat(cpax, ignore_index=True) if cpax else pd.DataFrame(columns=ROUTE_KEYS + ["TkCarrier","Passengers"])
+    # the same quarter may come from more than one file pair; the sums simply add up
+    routes = routes.groupby(ROUTE_KEYS, as_index=False, sort=False)[ROUTE_SUMS].sum()
+    cpax = cpax.groupby(ROUTE_KEYS + ["TkCarrier"], as_index=False, sort=False)["Passengers"].sum()
+    return routes, cpax
+
+OTP_COLS = ["Date","Origin","Dest","Delay","Cancelled"]
+# dates and airports repeat millions of times; as categories each distinct value is parsed once
+OTP_DTYPES = {"Date": "category", "Origin": "category", "Dest": "category"}
+OTP_SUMS = ["flights","bad","delay_sum","delay_n"]
+
+
+def otp_sums(f: pd.DataFrame, quarters: set[str] | None = None) -> pd.DataFrame:
+    # additive per-route OTP aggregates of one chunk, keeping only `quarters` when given
+    dates = f["Date"].astype("category")
+    dt = pd.to_datetime(pd.Series(np.asarray(dates.cat.categories, dtype=object)), errors="coerce")
+    tags = quarter_tags(dt.dt.year.fillna(0), dt.dt.quarter.fillna(0)).where(dt.notna())
+    wanted = tags.notna() & (tags.isin(quarters) if quarters is not None else True)
+    # code -1 (missing date) lands on the appended slot
+    codes = dates.cat.codes.to_numpy()
+    rows = np.append(wanted.to_numpy(dtype=bool), False)[codes]
+    rows &= f["Origin"].notna().to_numpy() & f["Dest"].notna().to_numpy()
+
+    f = f[rows]
+    delay = pd.to_numeric(f["Delay"], errors="coerce")
+    cancelled = pd.to_numeric(f["Cancelled"], errors="coerce").fillna(0).astype(int)
+    part = pd.DataFrame({
+        "Origin": f["Origin"].astype(str),
+        "Dest": f["Dest"].astype(str),
+        "quarter_tag": np.append(tags.to_numpy(dtype=object), None)[codes[rows]],
+        "bad": ((delay.fillna(0) > 0) | (cancelled == 1)).astype(int),
+        "delay": delay.clip(lower=0),
+    })
+    return (part.groupby(ROUTE_KEYS, as_index=False, sort=False)
+                .agg(flights=("bad","size"),
+                     bad=("bad","sum"),
+                     delay_sum=("delay","sum"),
+                     delay_n=("delay","count")))
+
+def load_flights_delay_2022_2025(quarters: set[str] | None = None, chunksize: int = 1_000_000) -> pd.DataFrame:
+    # streams the flights CSV; only rows in `quarters` (the DB1B ones) are aggregated
+    sums = None
+    for f in safe_read_csv(FLIGHTS_CSV, OTP_COLS, OTP_DTYPES, chunksize):
+        perf.count("otp_rows", len(f))
+        sums = fold_sums(sums, otp_sums(f, quarters), ROUTE_KEYS)
+    if sums is None:
+        sums = pd.DataFrame({c: pd.Series(dtype=object) for c in ROUTE_KEYS}
+                            | {c: pd.Series(dtype="int64") for c in OTP_SUMS})
+
+    agg = sums.sort_values(ROUTE_KEYS).reset_index(drop=True)
+    agg["avg_delay"] = (agg["delay_sum"] / agg["delay_n"]).where(agg["delay_n"] > 0)
+    agg["delay_rate"] = (agg["bad"] / agg["flights"]).replace([np.inf, -np.inf], np.nan)
+    return agg[ROUTE_KEYS + ["flights","bad","avg_delay","delay_rate"]]
 
-    m["fare_x_pax"] = pd.to_numeric(m["ItinFare"], errors="coerce") * pd.to_numeric(m["Passengers"], errors="coerce")
-    carriers = (m.groupby(["Origin","Dest","quarter_tag"])["TkCarrier"]
-                  .apply(lambda s: ",".join(sorted(pd.Series(s).dropna().astype(str).str.strip().unique())))
-                  .reset_index()
-                  .rename(columns={"TkCarrier":"carriers"}))
 
-    cpax = (m.dropna(subset=["TkCarrier"])
-              .groupby(["Origin","Dest","quarter_tag","TkCarrier"], as_index=False)["Passengers"].sum())
+def db1b_aggregates(keys: list[str]) -> dict[str, pd.DataFrame]:
+    # the merged partitions as the route aggregate and the carrier sets (every ticketing
+    # carrier, and the one flying the most passengers) per route
+    agg_db1b, cpax, carriers = finish_db1b(*merge_partitions(keys))
+
     if not cpax.empty:
         idx = cpax.groupby(["Origin","Dest","quarter_tag"])["Passengers"].idxmax()
         primary = (cpax.loc[idx, ["Origin","Dest","quarter_tag","TkCarrier"]]
@@ -98,19 +336,14 @@ def build_edges_2025() -> pd.DataFrame:
     else:
         primary = pd.DataFrame(columns=["Origin","Dest","quarter_tag","primary_carrier"])
 
-    agg_db1b = (m.groupby(["Origin","Dest","quarter_tag"], as_index=False)
-                  .agg(passengers=("Passengers","sum"),
-                       fare_num=("fare_x_pax","sum"),
-                       coupon_avg_miles=("Distance","mean")))
-
     agg_db1b["wavg_itin_fare_usd"] = (agg_db1b["fare_num"] / agg_db1b["passengers"]).replace([np.inf, -np.inf], np.nan)
     agg_db1b["avg_distance_miles"] = agg_db1b["coupon_avg_miles"]
+    carriers = carriers.merge(primary, on=["Origin","Dest","quarter_tag"], how="left")
+    return {"db1b": agg_db1b, "carriers": carriers}
 
-    otp = load_flights_delay_2022_2025()
-
+def merge_edges(agg_db1b: pd.DataFrame, otp: pd.DataFrame, carriers: pd.DataFrame) -> pd.DataFrame:
     edges = (agg_db1b.merge(otp, on=["Origin","Dest","quarter_tag"], how="left")
-                      .merge(carriers, on=["Origin","Dest","quarter_tag"], how="left")
-                      .merge(primary, on=["Origin","Dest","quarter_tag"], how="left"))
+                      .merge(carriers, on=["Origin","Dest","quarter_tag"], how="left"))
 
     km = pd.to_numeric(edges["avg_distance_miles"], errors="coerce") * 1.60934
     edges["est_emissions_kgco2"] = km * 0.115
@@ -129,6 +362,57 @@ def build_edges_2025() -> pd.DataFrame:
             edges[col] = np.nan
     return edges[keep].sort_values(["Origin","Dest","quarter_tag"]).reset_index(drop=True)
 
+def edge_stages(build: BuildCache, streaming: bool = False, chunksize: int = 500_000,
+                workers: int | None = None, rebuild: bool = False) -> Output:
+    # partitions -> DB1B aggregate + carrier sets, OTP aggregate -> edges; each step is
+    # redone only when what it is computed from changed
+    with perf.stage("db1b_partitions"):
+        manifest = update_partitions(streaming, chunksize, workers, rebuild, build)
+    keys = sorted(manifest)
+
+    def merge():
+        with perf.stage("db1b_merge"):
+            return db1b_aggregates(keys)
+    db1b = build.stage("db1b_merge", {"partitions": {k: manifest[k]["hashes"] for k in keys}}, merge)
+
+    # the DB1B quarters are in the partition manifest, so an unchanged OTP file is not reread
+    quarters = sorted({q for k in keys for q in manifest[k]["quarters"]})
+    if not FLIGHTS_CSV.exists():
+        raise FileNotFoundError(f"Missing required file: {FLIGHTS_CSV}")
+
+    def aggregate_otp():
+        print(f"[OTP ] Loading {FLIGHTS_CSV.name}")
+        with perf.stage("otp_aggregate"):
+            return {"otp": load_flights_delay_2022_2025(set(quarters))}
+    otp = build.stage("otp_aggregate", {"flights": build.input_hash(FLIGHTS_CSV), "quarters": quarters},
+                      aggregate_otp)
+
+    def join():
+        with perf.stage("edges_merge"):
+            return {"edges": merge_edges(db1b["db1b"].frame(), otp["otp"].frame(), db1b["carriers"].frame())}
+    return build.stage("edges_merge", {name: out.sha1 for name, out in [*db1b.items(), *otp.items()]},
+                       join)["edges"]
+
+def build_edges_2025(streaming: bool = False, chunksize: int = 500_000, workers: int | None = None,
+                     rebuild: bool = False) -> pd.DataFrame:
+    return edge_stages(BuildCache(), streaming, chunksize, workers, rebuild).frame()
+
+
+def carrier_items(edges: pd.DataFrame) -> pd.DataFrame:
+    # one row per (edge row, carrier) token: the comma-separated carriers first, then the
+    # primary carrier; "pos" is the global order the tokens were seen in
+    row = np.arange(len(edges))
+    listed = (pd.DataFrame({"row": row, "item": edges["carriers"].astype(object).str.split(",")})
+                .explode("item"))
+    listed["seq"] = listed.groupby("row").cumcount()
+    primary = pd.DataFrame({"row": row, "item": edges["primary_carrier"].astype(object), "seq": np.iinfo(np.int64).max})
+    items = pd.concat([listed, primary], ignore_index=True)
+    items["item"] = items["item"].astype(object).str.strip()
+    items = items[items["item"].notna() & (items["item"] != "")]
+    items = items.sort_values(["row","seq"], kind="stable").reset_index(drop=True)
+    items["pos"] = np.arange(len(items))
+    return items[["row","item","pos"]]
+
 
 def build_nodes_from_edges(edges: pd.DataFrame) -> pd.DataFrame:
 
@@ -136,54 +420,36 @@ def build_nodes_from_edges(edges: pd.DataFrame) -> pd.DataFrame:
     dests   = edges[["Dest"]].rename(columns={"Dest":"Airport"})
     airports = pd.concat([origins, dests], axis=0).dropna().drop_duplicates().reset_index(drop=True)
 
-    def explode_carriers(df, col_air):
-        df2 = df[[col_air, "carriers","primary_carrier"]].copy()
-        lst = []
-        for _, r in df2.iterrows():
-            items = []
-            if isinstance(r.get("carriers"), str) and r["carriers"].strip():
-                items.extend([x.strip() for x in r["carriers"].split(",") if x.strip()])
-            pc = r.get("primary_carrier")
-            if isinstance(pc, str) and pc.strip():
-                items.append(pc.strip())
-            items = sorted(set(items))
-            lst.append(items)
-        df2["carrier_list"] = lst
-        return df2
-
-    out_car = explode_carriers(edges.rename(columns={"Origin":"Airport"}), "Airport")
-    in_car  = explode_carriers(edges.rename(columns={"Dest":"Airport"}), "Airport")
-
-    def union_lists(series):
-        s = set()
-        for lst in series:
-            s |= set(lst or [])
-        return sorted(s)
-
-    out_car_g = (out_car.groupby("Airport")["carrier_list"]
-                      .apply(union_lists).reset_index().rename(columns={"carrier_list":"carriers_out"}))
-    in_car_g  = (in_car.groupby("Airport")["carrier_list"]
-                      .apply(union_lists).reset_index().rename(columns={"carrier_list":"carriers_in"}))
-
-    node_df = airports.merge(out_car_g, on="Airport", how="left").merge(in_car_g, on="Airport", how="left")
-    node_df["carriers_out"] = node_df["carriers_out"].apply(lambda x: x if isinstance(x, list) else [])
-    node_df["carriers_in"]  = node_df["carriers_in"].apply(lambda x: x if isinstance(x, list) else [])
-    node_df["carriers_serving"] = node_df.apply(lambda r: sorted(set(r["carriers_out"]) | set(r["carriers_in"])), axis=1)
-
-    def top3_for_airport(ap):
-        mask = (edges["Origin"] == ap) | (edges["Dest"] == ap)
-        s = []
-        for _, r in edges.loc[mask, ["carriers","primary_carrier"]].iterrows():
-            if isinstance(r["carriers"], str) and r["carriers"].strip():
-                s += [x.strip() for x in r["carriers"].split(",") if x.strip()]
-            if isinstance(r["primary_carrier"], str) and r["primary_carrier"].strip():
-                s.append(r["primary_carrier"].strip())
-        if not s:
-            return []
-        counts = pd.Series(s).value_counts()
-        return counts.index.tolist()[:3]
-
-    node_df["top3_carriers"] = node_df["Airport"].apply(top3_for_airport)
+    items = carrier_items(edges)
+    origin = edges["Origin"].to_numpy()[items["row"].to_numpy()]
+    dest = edges["Dest"].to_numpy()[items["row"].to_numpy()]
+    by_out = pd.DataFrame({"Airport": origin, "item": items["item"].to_numpy(), "pos": items["pos"].to_numpy()})
+    by_in = pd.DataFrame({"Airport": dest, "item": items["item"].to_numpy(), "pos": items["pos"].to_numpy()})
+
+    def carrier_sets(df):
+        return (df.dropna(subset=["Airport"])
+                  .drop_duplicates(["Airport","item"])
+                  .sort_values(["Airport","item"])
+                  .groupby("Airport")["item"].agg(list))
+
+    # self-loop rows touch their airport once, as the old per-airport mask did
+    touching = pd.concat([by_out, by_in[dest != origin]], ignore_index=True)
+    counts = (touching.dropna(subset=["Airport"])
+                      .groupby(["Airport","item"], as_index=False)
+                      .agg(n=("pos","size"), first=("pos","min")))
+    # most used first; ties keep first-seen order, which is what value_counts() did
+    top3 = (counts.sort_values(["Airport","n","first"], ascending=[True, False, True])
+                  .groupby("Airport").head(3)
+                  .groupby("Airport", sort=False)["item"].agg(list))
+
+    def as_lists(mapping):
+        return [x if isinstance(x, list) else [] for x in node_df["Airport"].map(mapping)]
+
+    node_df = airports.copy()
+    node_df["carriers_out"] = as_lists(carrier_sets(by_out))
+    node_df["carriers_in"] = as_lists(carrier_sets(by_in))
+    node_df["carriers_serving"] = as_lists(carrier_sets(pd.concat([by_out, by_in], ignore_index=True)))
+    node_df["top3_carriers"] = as_lists(top3)
 
     deg_out = (edges.groupby("Origin")["Dest"].nunique().rename("deg_out")).reset_index().rename(columns={"Origin":"Airport"})
     deg_in  = (edges.groupby("Dest")["Origin"].nunique().rename("deg_in")).reset_index().rename(columns={"Dest":"Airport"})
@@ -211,16 +477,23 @@ def build_nodes_from_edges(edges: pd.DataFrame) -> pd.DataFrame:
 
 
 def to_json_records(df: pd.DataFrame, path: Path):
-    path.parent.mkdir(exist_ok=True)
-    df.to_json(path, orient="records")
+    write_json(df, path)
+
+
+CACHE_EXTS = {"columnar": [".col"], "json": [".json"], "both": [".col", ".json"]}
+CACHE_STEMS = ["edges_2025", "edges_min_2025", "nodes_2025"]
 
 
-def main():
-    print(f"[DB1B] Loading {COUPON_CSV.name} + {TICKET_CSV.name}")
-    print(f"[OTP ] Loading {FLIGHTS_CSV.name}")
+def other_format_files(fmt: str) -> list[Path]:
+    # cache files of the format(s) not written; left behind they would be served stale,
+    # since readers prefer .col when both exist
+    return [CACHE / f"{stem}{ext}" for ext in CACHE_EXTS["both"] if ext not in CACHE_EXTS[fmt]
+            for stem in CACHE_STEMS]
 
-    edges = build_edges_2025()
-    nodes = build_nodes_from_edges(edges)
+
+def write_outputs(edges: pd.DataFrame, nodes: pd.DataFrame, fmt: str):
+    perf.count("edges", len(edges))
+    perf.count("nodes", len(nodes))
 
     rich_cols = [
         "Origin","Dest","quarter_tag","passengers","wavg_itin_fare_usd","avg_distance_miles",
@@ -230,16 +503,89 @@ def main():
 
     min_cols = [
         "Origin","Dest","avg_distance_miles","wavg_itin_fare_usd",
-        "delay_rate","est_emissions_kgco2","quarter_tag","primary_carrier"
+        "delay_rate","est_emissions_kgco2","quarter_tag","primary_carrier","passengers"
     ]
     edges_min = edges[min_cols]
 
-    to_json_records(edges_rich, CACHE / "edges_2025.json")
-    to_json_records(edges_min,  CACHE / "edges_min_2025.json")
-    to_json_records(nodes,      CACHE / "nodes_2025.json")
-
-    print("wrote cache/edges_2025.json and cache/edges_min_2025.json")
-    print("wrote cache/nodes_2025.json (nodes include carriers_serving & top3_carriers)")
+    for ext in CACHE_EXTS[fmt]:
+        with perf.stage(f"write_cache{ext}"):
+            write_cache(edges_rich, CACHE / f"edges_2025{ext}")
+            write_cache(edges_min,  CACHE / f"edges_min_2025{ext}")
+            write_cache(nodes,      CACHE / f"nodes_2025{ext}")
+
+        print(f"wrote cache/edges_2025{ext} and cache/edges_min_2025{ext}")
+        print(f"wrote cache/nodes_2025{ext} (nodes include carriers_serving & top3_carriers)")
+
+    for f in other_format_files(fmt):
+        if f.exists():
+            f.unlink()
+            print(f"removed stale {f}")
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Build the SkyPath edge/node cache from the BTS CSVs.")
+    ap.add_argument("--stream", action="store_true",
+                    help="read DB1B in chunks; memory is bounded by the number of routes")
+    ap.add_argument("--chunksize", type=int, default=500_000)
+    ap.add_argument("--workers", type=int, default=None,
+                    help="processes for building DB1B quarter partitions (default: all cores)")
+    ap.add_argument("--rebuild", action="store_true",
+                    help="rebuild every DB1B partition and aggregate instead of only what changed")
+    ap.add_argument("--format", choices=sorted(CACHE_EXTS), default="both",
+                    help="cache format(s) to write; the app prefers columnar when present")
+    ap.add_argument("--route-table", type=int, default=None, metavar="N",
+                    help="precompute best-k routes between the top-N airports by degree; an existing "
+                         "table is refreshed incrementally even without this flag")
+    args = ap.parse_args(argv)
+    # the per-stage report is always printed; SKYPATH_PERF_LOG also gets it as JSON
+    perf.enable()
+    run_start = perf.snapshot()
+
+    print(f"[DB1B] Partitions from {DATA / COUPON_GLOB}" + (" (streaming)" if args.stream else ""))
+
+    build = BuildCache(BUILD, rebuild=args.rebuild)
+    with perf.stage("build_edges"):
+        edges_out = edge_stages(build, streaming=args.stream, chunksize=args.chunksize,
+                                workers=args.workers, rebuild=args.rebuild)
+
+    def nodes_from_edges():
+        with perf.stage("build_nodes"):
+            return {"nodes": build_nodes_from_edges(edges_out.frame())}
+    nodes_out = build.stage("build_nodes", {"edges": edges_out.sha1}, nodes_from_edges)["nodes"]
+    build.save()
+
+    # the cache files are rewritten only when their contents would change
+    files = [CACHE / f"{stem}{ext}" for ext in CACHE_EXTS[args.format] for stem in CACHE_STEMS]
+    outputs = {"edges": edges_out.sha1, "nodes": nodes_out.sha1, "format": args.format}
+    written = build.manifest.get("outputs", {})
+    current = written.get("key") == outputs and all(
+        f.exists() and file_stamp(f) == written["files"].get(f.name) for f in files) and not any(
+        f.exists() for f in other_format_files(args.format))
+    if current:
+        print(f"[BUILD] {', '.join(f.name for f in files)} up to date")
+    else:
+        write_outputs(edges_out.frame(), nodes_out.frame(), args.format)
+        build.manifest["outputs"] = {"key": outputs, "files": {f.name: file_stamp(f) for f in files}}
+        build.save()
+
+    # the route table, hub labels and startup manifest follow the cache files
+    if not current or args.route_table is not None:
+        with perf.stage("route_table"):
+            done = routetable.refresh(CACHE, args.route_table)
+        if done is not None:
+            print(f"refreshed {ROUTE_TABLE_PATH}: recomputed {sum(done.values())} (pair, metric) entries")
+    if not current or not (CACHE / hublabels.HUB_LABELS.name).exists():
+        with perf.stage("hub_labels"):
+            built = hublabels.refresh(CACHE)
+        print(f"refreshed {CACHE / hublabels.HUB_LABELS.name}: rebuilt {len(built)} (metric, view) label sets")
+    if not current or startup.read_manifest(CACHE) is None:
+        with perf.stage("startup_manifest"):
+            manifest = startup.write_manifest(CACHE)
+        print(f"wrote {manifest} (airports, fare bounds and default ranking the app starts from)")
+
+    this_run = perf.since(run_start)
+    print(perf.report(this_run, "datalogging stages"))
+    perf.log_report(this_run, source="datalogging")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,427 @@
+from __future__ import annotations
+from collections import Counter
+from functools import cached_property
+import copy
+from pathlib import Path
+import argparse
+import multiprocessing as mp
+import os
+import time
+import numpy as np
+import pandas as pd
+
+import perf
+from colcache import read_cache, resolve_cache
+from hublabels import HUB_LABELS, attach
+from paths import k_shortest_with_fallbacks, pareto_with_fallbacks
+from resultcache import DELAY_BUCKET, PRICE_BUCKET, LRUCache, bucket
+from routegraph import RouteGraph, RouteView
+from routetable import ROUTE_TABLE, default_price_range, lookup_routes, price_bounds
+from startup import (CACHE, DEFAULT_MAX_DELAY, LATEST, METRICS, PASSENGER_WEIGHTED, QUARTER_AGGREGATES,
+                     ROUTES_RANGE, STOPS_RANGE, cache_version)
+
+RESULT_CACHE_SIZE = 2048
+SUMMARY_CACHE_SIZE = 64
+RANKING_ROWS = 20
+SAMPLE_ROWS = 300
+SAMPLE_COLS = ["Origin","Dest","avg_distance_miles","wavg_itin_fare_usd",
+               "delay_rate","est_emissions_kgco2","quarter_tag","primary_carrier","carriers"]
+
+
+def metric_key(name: str) -> str:
+    return METRICS[name]
+
+@perf.timed("load_edges_nodes")
+def load_edges_nodes(cache: Path = CACHE) -> tuple[pd.DataFrame, pd.DataFrame]:
+    e = read_cache(resolve_cache(cache, "edges_min_2025"))
+    n = read_cache(resolve_cache(cache, "nodes_2025"))
+
+    defaults = {
+        "avg_distance_miles": np.nan,
+        "wavg_itin_fare_usd": np.nan,
+        "delay_rate": np.nan,
+        "est_emissions_kgco2": np.nan,
+        "quarter_tag": "",
+        "primary_carrier": "",
+        "carriers": "",
+    }
+    for c, v in defaults.items():
+        if c not in e.columns:
+            e[c] = v
+
+    need_pc = (e["primary_carrier"].astype(str).str.strip() == "") & (e["carriers"].astype(str).str.strip() != "")
+    if need_pc.any():
+        e["primary_carrier"] = e["primary_carrier"].astype(object)
+        e.loc[need_pc, "primary_carrier"] = (
+            e.loc[need_pc, "carriers"].astype(str).str.split(",").str[0].str.strip()
+        )
+    return e, n
+
+def filter_edges(edges: pd.DataFrame, price_range: tuple[float, float], max_delay: float) -> pd.DataFrame:
+    return edges[
+        (edges["wavg_itin_fare_usd"].fillna(np.inf) >= price_range[0]) &
+        (edges["wavg_itin_fare_usd"].fillna(np.inf) <= price_range[1]) &
+        (edges["delay_rate"].fillna(0.0) <= max_delay)
+    ].copy()
+
+def route_cost(G: RouteView, path: list[str], weight: str) -> float:
+    return G.route_cost(path, weight)
+
+def summarize_carriers(leg_carriers: list[str], topn: int = 3) -> str:
+    counts = Counter([c for c in leg_carriers if c])
+    if not counts:
+        return "N/A"
+    top = counts.most_common(topn)
+    if len(top) == 1 or top[0][1] > top[1][1]:
+        return top[0][0]
+    return "No clear winner · top-3: " + ", ".join([c for c, _ in top])
+
+
+class SkyPathEngine:
+    # Everything the app shows, without Streamlit: the edge/node frames, the compiled
+    # route graph and the precomputed route table, plus the queries over them. Search
+    # results are kept in a shared LRU cache keyed on the query and the data version.
+
+    def __init__(self, edges: pd.DataFrame, nodes: pd.DataFrame, route_table: Path | None = None,
+                 version: tuple | str | None = None, cache_size: int = RESULT_CACHE_SIZE):
+        self.edges = edges
+        self.nodes = nodes
+        self.graph = RouteGraph.from_edges(edges)
+        self.route_table = route_table
+        self.version = version if version is not None else self.graph.fingerprint
+        self.cache_dir = None
+        self.results = LRUCache(cache_size)
+        self.summaries = LRUCache(SUMMARY_CACHE_SIZE)
+        self._selections = {LATEST: self}
+
+    @classmethod
+    def from_cache(cls, cache: Path = CACHE, cache_size: int = RESULT_CACHE_SIZE) -> "SkyPathEngine":
+        # stamp first: a rebuild that lands while loading still shows up as stale
+        version = cache_version(cache)
+        e, n = load_edges_nodes(cache)
+        engine = cls(e, n, Path(cache) / ROUTE_TABLE.name, version=version, cache_size=cache_size)
+        engine.cache_dir = Path(cache)
+        # single-route queries on the whole graph or the default filters use prebuilt hub labels
+        attach(engine.graph, Path(cache) / HUB_LABELS.name)
+        return engine
+
+    def stale(self) -> bool:
+        # True once the cache files this engine was loaded from have been rebuilt
+        return self.cache_dir is not None and cache_version(self.cache_dir) != self.version
+
+    @cached_property
+    def airports(self) -> list[str]:
+        return sorted(set(self.edges["Origin"]).union(self.edges["Dest"]))
+
+    @cached_property
+    def price_bounds(self) -> tuple[float, float]:
+        return price_bounds(self.edges)
+
+    @cached_property
+    def default_price_range(self) -> tuple[int, int]:
+        return default_price_range(self.edges)
+
+    @property
+    def quarters(self) -> list[str]:
+        return [q for q in self.graph.quarters if q]
+
+    def for_quarter(self, selection: str) -> "SkyPathEngine":
+        # the same frames and topology, routing on one quarter selection; cached, and
+        # sharing everything but the selected weight arrays with this engine
+        if selection not in self._selections:
+            selected = copy.copy(self)
+            selected.graph = self.graph.select(selection)
+            self._selections[selection] = selected
+        return self._selections[selection]
+
+    def filtered_view(self, price_range: tuple[float, float], max_delay: float) -> RouteView:
+        return self.graph.view(self.graph.filter_mask(price_range, max_delay))
+
+    def filter_edges(self, price_range: tuple[float, float], max_delay: float) -> pd.DataFrame:
+        edges = self.edges
+        if self.graph.selection in self.quarters:
+            edges = edges[edges["quarter_tag"].astype(str) == self.graph.selection]
+        return filter_edges(edges, price_range, max_delay)
+
+    def leg_carrier(self, u: str, v: str) -> str:
+        perf.count("leg_lookups")
+        return self.graph.leg_carrier(u, v)
+
+    def _key(self, *query, price_range: tuple[float, float], max_delay: float):
+        # None (not cacheable) when a filter is finer than the sliders' grid
+        grid = (bucket(price_range[0], PRICE_BUCKET), bucket(price_range[1], PRICE_BUCKET),
+                bucket(max_delay, DELAY_BUCKET))
+        if None in grid:
+            return None
+        return query + grid + (self.graph.selection, self.version)
+
+    @perf.timed("search")
+    def search(self, s: str, t: str, weight: str, k: int, price_range: tuple[float, float],
+               max_delay: float, max_stops: int | None = None):
+        key = self._key("k-shortest", s, t, weight, int(k), max_stops,
+                        price_range=price_range, max_delay=max_delay)
+        return self.results.get_or_compute(
+            key, lambda: self._search(s, t, weight, k, price_range, max_delay, max_stops))
+
+    def _search(self, s: str, t: str, weight: str, k: int, price_range: tuple[float, float],
+                max_delay: float, max_stops: int | None = None):
+        # default-filter queries between top airports are answered from the precomputed table
+        if self.route_table is not None and max_stops is None:
+            answer = lookup_routes(self.graph, s, t, weight, k, price_range, max_delay, self.route_table)
+            if answer is not None:
+                return answer
+        return k_shortest_with_fallbacks(self.graph, s, t, weight, k, price_range, max_delay, max_stops)
+
+    def cost_view(self, G_used) -> RouteView:
+        # the view a search's paths are costed on: the one it searched, which for the
+        # undirected fallback includes legs flown in reverse
+        return G_used if isinstance(G_used, RouteView) else self.graph.view()
+
+    def route_rows(self, paths: list[list[str]], weight: str, G_used: RouteView | None = None) -> list[dict]:
+        G_cost = self.cost_view(G_used)
+        rows = []
+        for path in paths:
+            leg_carriers = [self.leg_carrier(path[i], path[i+1]) for i in range(len(path)-1)]
+            rows.append({
+                "Route": " → ".join(path),
+                "Stops": max(0, len(path)-2),
+                "Suggested airline": summarize_carriers(leg_carriers, topn=3),
+                "cost": round(route_cost(G_cost, path, weight), 3),
+            })
+        return rows
+
+    @perf.timed("pareto")
+    def pareto(self, s: str, t: str, weights: tuple[str, ...], price_range: tuple[float, float],
+               max_delay: float, max_stops: int = 2) -> tuple[pd.DataFrame, str]:
+        # the routes no other route beats on every one of `weights`, cheapest first
+        key = self._key("pareto", s, t, tuple(weights), int(max_stops),
+                        price_range=price_range, max_delay=max_delay)
+        frontier, label = self.results.get_or_compute(
+            key, lambda: pareto_with_fallbacks(self.graph, s, t, tuple(weights), price_range, max_delay, max_stops))
+        labels = {v: k for k, v in METRICS.items()}
+        rows = []
+        for path, costs in frontier:
+            legs = [self.leg_carrier(path[i], path[i+1]) for i in range(len(path)-1)]
+            row = {"Route": " → ".join(path), "Stops": max(0, len(path)-2),
+                   "Suggested airline": summarize_carriers(legs, topn=3)}
+            row.update({labels[w]: round(c, 3) for w, c in zip(weights, costs)})
+            rows.append(row)
+        return pd.DataFrame(rows), label
+
+    def path_legs(self, path: list[str], G_cost: RouteView) -> tuple[list[dict], list[str]]:
+        legs, leg_carriers = [], []
+        for i in range(len(path)-1):
+            u, v = path[i], path[i+1]
+            d = (G_cost.edge_data(u, v) or
+                 {"distance": np.nan, "fare": np.nan, "delay": np.nan, "co2": np.nan})
+            pc = self.leg_carrier(u, v)
+            if pc: leg_carriers.append(pc)
+            legs.append({
+                "From": u, "To": v, "Carrier": pc if pc else "(n/a)",
+                "Distance": d.get("distance", np.nan),
+                "FareUSD": d.get("fare", np.nan),
+                "DelayRate": d.get("delay", np.nan),
+                "CO2 (kg)": d.get("co2", np.nan),
+            })
+        return legs, leg_carriers
+
+    def direct_connections(self, origin: str, G: RouteView) -> pd.DataFrame:
+        out_rows = []
+        if origin in G:
+            for _, v, d in G.out_edges(origin, data=True):
+                out_rows.append({
+                    "To": v,
+                    "Carrier": self.leg_carrier(origin, v) or "(n/a)",
+                    "Distance": d.get("distance", np.nan),
+                    "FareUSD": d.get("fare", np.nan),
+                    "DelayRate": d.get("delay", np.nan),
+                    "CO2 (kg)": d.get("co2", np.nan),
+                })
+        df = pd.DataFrame(out_rows)
+        sort_cols = [c for c in ["FareUSD", "Distance"] if c in df.columns]
+        if sort_cols:
+            df = df.sort_values(sort_cols, na_position="last")
+        return df
+
+    def summary(self, price_range: tuple[float, float], max_delay: float) -> dict:
+        # the parts of a page that depend only on the filters, cached apart from the searches
+        key = self._key("summary", price_range=price_range, max_delay=max_delay)
+        return self.summaries.get_or_compute(key, lambda: self._summary(price_range, max_delay))
+
+    def _summary(self, price_range: tuple[float, float], max_delay: float) -> dict:
+        G_filtered = self.filtered_view(price_range, max_delay)
+        edges = self.filter_edges(price_range, max_delay)
+        return {
+            "airports": G_filtered.number_of_nodes(),
+            "routes": G_filtered.number_of_edges(),
+            "ranking": G_filtered.degree().sort_values(ascending=False, kind="stable").head(RANKING_ROWS).to_frame(),
+            "sample": edges[[c for c in SAMPLE_COLS if c in edges.columns]].head(SAMPLE_ROWS),
+        }
+
+    def page(self, origin: str, dest: str, weight: str, k: int, price_range: tuple[float, float],
+             max_delay: float) -> dict:
+        # what app.py shows for one query, apart from the Pareto section
+        G_filtered = self.filtered_view(price_range, max_delay)
+        paths, label, G_used = self.search(origin, dest, weight, k, price_range, max_delay)
+        page = dict(self.summary(price_range, max_delay),
+                    label=label, paths=paths, rows=pd.DataFrame(self.route_rows(paths, weight, G_used)), best=None,
+                    direct=self.direct_connections(origin, G_filtered))
+        if paths:
+            G_cost = self.cost_view(G_used)
+            legs, leg_carriers = self.path_legs(paths[0], G_cost)
+            page["best"] = {"path": paths[0], "cost": route_cost(G_cost, paths[0], weight),
+                            "legs": pd.DataFrame(legs), "airline": summarize_carriers(leg_carriers, topn=3)}
+        return page
+
+    def answer(self, q: dict) -> list[dict]:
+        # one batch query -> one row per suggested route (or a single no-path row)
+        engine = self.for_quarter(q["quarter"])
+        paths, label, G_used = engine.search(q["origin"], q["dest"], q["metric"], int(q["k"]),
+                                        (q["price_min"], q["price_max"]), q["max_delay"], q["max_stops"])
+        base = {"query_id": q["query_id"], "origin": q["origin"], "dest": q["dest"],
+                "metric": q["metric"], "quarter": q["quarter"], "label": label}
+        if not paths:
+            return [dict(base, rank=None, route=None, stops=None, suggested_airline=None, cost=None)]
+        return [dict(base, rank=i, route=r["Route"], stops=r["Stops"],
+                     suggested_airline=r["Suggested airline"], cost=r["cost"])
+                for i, r in enumerate(engine.route_rows(paths, q["metric"], G_used))]
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    return pd.read_parquet(path) if Path(path).suffix == ".parquet" else pd.read_csv(path)
+
+def write_table(df: pd.DataFrame, path: Path):
+    if Path(path).suffix == ".parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+def _numeric(q: pd.DataFrame, col: str) -> pd.Series:
+    # a column of finite numbers; a ValueError names the rows that are not
+    values = pd.to_numeric(q[col], errors="coerce").astype(float)
+    bad = q.index[~np.isfinite(values.to_numpy())]
+    if len(bad):
+        rows = ", ".join(map(str, bad[:10])) + (", ..." if len(bad) > 10 else "")
+        raise ValueError(f"{col} must be a finite number; bad value in row(s) {rows}")
+    return values
+
+def normalize_queries(queries: pd.DataFrame, engine: SkyPathEngine) -> pd.DataFrame:
+    # origin, dest are required; metric (key or UI label), k, price_min, price_max,
+    # max_delay and quarter (a quarter_tag, "latest" or "passengers") default to the app's defaults;
+    # k is clamped to the app's range, and so is max_stops (no cap when absent or empty)
+    q = queries.copy()
+    missing = {"origin", "dest"} - set(q.columns)
+    if missing:
+        raise ValueError(f"queries are missing column(s): {', '.join(sorted(missing))}")
+    lo, hi = engine.default_price_range
+    for col, default in [("metric", "distance"), ("k", 5), ("price_min", lo), ("price_max", hi),
+                         ("max_delay", DEFAULT_MAX_DELAY), ("quarter", LATEST)]:
+        q[col] = q[col].fillna(default) if col in q.columns else default
+    for col in ("k", "price_min", "price_max", "max_delay"):
+        q[col] = _numeric(q, col)
+    q["k"] = q["k"].astype(int).clip(*ROUTES_RANGE)
+    if "max_stops" in q.columns:
+        given = q["max_stops"].notna()
+        stops = _numeric(q[given], "max_stops").astype(int).clip(*STOPS_RANGE)
+        q["max_stops"] = [int(stops[i]) if g else None for i, g in zip(q.index, given)]
+    else:
+        q["max_stops"] = None
+    q["metric"] = q["metric"].map(lambda m: METRICS.get(m, m))
+    bad = set(q["metric"]) - set(METRICS.values())
+    if bad:
+        raise ValueError(f"unknown metric(s): {', '.join(sorted(map(str, bad)))}")
+    q["quarter"] = q["quarter"].astype(str).map(lambda s: QUARTER_AGGREGATES.get(s, s))
+    bad = set(q["quarter"]) - set(QUARTER_AGGREGATES.values()) - set(engine.quarters)
+    if bad:
+        raise ValueError(f"unknown quarter(s): {', '.join(sorted(bad))}")
+    q["origin"] = q["origin"].astype(str).str.strip().str.upper()
+    q["dest"] = q["dest"].astype(str).str.strip().str.upper()
+    q["query_id"] = np.arange(len(q))
+    return q
+
+
+_engine: SkyPathEngine | None = None
+
+def _init_worker(cache: Path):
+    # forked workers inherit the parent's engine (its arrays stay shared copy-on-write);
+    # spawned ones load their own from the cache
+    global _engine
+    if _engine is None:
+        _engine = SkyPathEngine.from_cache(cache)
+
+def _answer_chunk(records: list[dict]) -> tuple[list[dict], int, int]:
+    # rows, plus this chunk's result-cache hits and misses (each worker has its own cache)
+    hits, misses = _engine.results.hits, _engine.results.misses
+    rows = [row for q in records for row in _engine.answer(q)]
+    return rows, _engine.results.hits - hits, _engine.results.misses - misses
+
+def run_batch(queries: pd.DataFrame, engine: SkyPathEngine | None = None, cache: Path = CACHE,
+              workers: int | None = None, chunksize: int = 64) -> tuple[pd.DataFrame, dict]:
+    global _engine
+    engine = engine or SkyPathEngine.from_cache(cache)
+    records = normalize_queries(queries, engine).to_dict("records")
+    workers = workers or os.cpu_count() or 1
+    chunks = [records[i:i + chunksize] for i in range(0, len(records), chunksize)]
+
+    t0 = time.perf_counter()
+    if workers == 1 or len(chunks) <= 1:
+        _engine = engine
+        parts = [_answer_chunk(c) for c in chunks]
+    else:
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("fork" if "fork" in methods else methods[0])
+        _engine = engine if ctx.get_start_method() == "fork" else None
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(cache,)) as pool:
+            parts = pool.map(_answer_chunk, chunks)
+    elapsed = time.perf_counter() - t0
+
+    results = pd.DataFrame([row for rows, _, _ in parts for row in rows])
+    stats = {"queries": len(records), "workers": workers, "seconds": elapsed,
+             "qps": len(records) / elapsed if elapsed > 0 else float("inf"),
+             "cache_hits": sum(p[1] for p in parts), "cache_misses": sum(p[2] for p in parts)}
+    return results, stats
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Headless SkyPath route queries.")
+    ap.add_argument("--cache", type=Path, default=CACHE)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("route", help="answer one query and print the suggested routes")
+    r.add_argument("origin")
+    r.add_argument("dest")
+    r.add_argument("--metric", default="distance", choices=sorted(METRICS.values()))
+    r.add_argument("--k", type=int, default=5)
+    r.add_argument("--price-min", type=float, default=None)
+    r.add_argument("--price-max", type=float, default=None)
+    r.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY)
+    r.add_argument("--quarter", default=LATEST, help=f"a quarter_tag, {LATEST} or {PASSENGER_WEIGHTED}")
+
+    b = sub.add_parser("batch", help="answer a CSV/Parquet file of queries")
+    b.add_argument("queries", type=Path,
+                   help="columns: origin, dest[, metric, k, price_min, price_max, max_delay, quarter]")
+    b.add_argument("--out", type=Path, default=None, help="CSV/Parquet output (default: print)")
+    b.add_argument("--workers", type=int, default=None, help="process pool size (default: all cores)")
+    args = ap.parse_args(argv)
+
+    engine = SkyPathEngine.from_cache(args.cache)
+    if args.cmd == "route":
+        q = pd.DataFrame([{"origin": args.origin, "dest": args.dest, "metric": args.metric, "k": args.k,
+                           "price_min": args.price_min, "price_max": args.price_max,
+                           "max_delay": args.max_delay, "quarter": args.quarter}])
+        results, _ = run_batch(q, engine, args.cache, workers=1)
+        print(results.drop(columns=["query_id"]).to_string(index=False))
+        return
+
+    results, stats = run_batch(read_table(args.queries), engine, args.cache, args.workers)
+    if args.out is not None:
+        write_table(results, args.out)
+        print(f"wrote {args.out}")
+    else:
+        print(results.to_string(index=False))
+    print(f"{stats['queries']} queries in {stats['seconds']:.2f} s on {stats['workers']} worker(s): "
+          f"{stats['qps']:.1f} queries/s; result cache {stats['cache_hits']} hits, "
+          f"{stats['cache_misses']} misses")
+
+if __name__ == "__main__":
+    main()
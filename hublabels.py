@@ -0,0 +1,139 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import hashlib
+import sqlite3
+import time
+import numpy as np
+
+import perf
+from colcache import read_cache, resolve_cache
+from paths import HubLabels, attach_hub_labels
+from routegraph import RouteGraph, WEIGHTS
+from routetable import default_price_range
+from startup import CACHE, DEFAULT_MAX_DELAY
+
+HUB_LABELS = CACHE / "hub_labels_2025.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS labels (metric TEXT, mask TEXT, name TEXT, size INTEGER,
+    side BLOB, node BLOB, hub BLOB, dist BLOB, legs BLOB, edge BLOB, PRIMARY KEY (metric, mask));
+"""
+# one row per (metric, view): the label entries as packed little-endian arrays
+COLUMNS = {"side": "<i1", "node": "<i4", "hub": "<i4", "dist": "<f8", "legs": "<i2", "edge": "<i4"}
+OUT, IN = 0, 1
+
+
+def mask_digest(graph: RouteGraph, mask: np.ndarray | None) -> str:
+    return hashlib.sha1(np.packbits(graph.active if mask is None else mask).tobytes()).hexdigest()
+
+def default_views(graph: RouteGraph, price_range: tuple[int, int]) -> dict[str, np.ndarray | None]:
+    # the whole graph and the app's default filters
+    return {"all": None, "filtered": graph.filter_mask(price_range, DEFAULT_MAX_DELAY)}
+
+
+def build_hub_labels(graph: RouteGraph, views: dict[str, np.ndarray | None],
+                     path: Path = HUB_LABELS) -> dict[str, int]:
+    # labels for every metric on every view; kept as they are when the graph is unchanged
+    path.parent.mkdir(exist_ok=True)
+    wanted = {(m, mask_digest(graph, mask)): (m, name, mask) for m in WEIGHTS for name, mask in views.items()}
+    con = sqlite3.connect(path)
+    try:
+        con.executescript(SCHEMA)
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+        if meta.get("fingerprint") != graph.fingerprint:
+            con.execute("DELETE FROM labels")
+        have = {(m, d) for m, d in con.execute("SELECT metric, mask FROM labels")}
+        for m, d in have - set(wanted):
+            con.execute("DELETE FROM labels WHERE metric = ? AND mask = ?", (m, d))
+        sizes = {}
+        for (metric, digest), (_, name, mask) in sorted(wanted.items()):
+            if (metric, digest) in have:
+                continue
+            labels = HubLabels.build(graph, metric, mask)
+            # entries in build order (busiest hub first), which the reader keeps
+            rows = [(side, node, hub, *entry)
+                    for side, table in ((OUT, labels.out), (IN, labels.inn))
+                    for node, entries in enumerate(table) for hub, entry in entries.items()]
+            cols = list(zip(*rows)) or [()] * len(COLUMNS)
+            blobs = [np.array(col, dtype=dt).tobytes() for col, dt in zip(cols, COLUMNS.values())]
+            con.execute("INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (metric, digest, name, len(rows), *blobs))
+            sizes[f"{metric}/{name}"] = len(rows)
+        con.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", ("fingerprint", graph.fingerprint))
+        con.commit()
+    finally:
+        con.close()
+    return sizes
+
+
+class HubLabelStore:
+    # The prebuilt labels of one graph, read from the file per (metric, view) on first use.
+    def __init__(self, graph: RouteGraph, path: Path, views: set[tuple[str, str]]):
+        self.graph = graph
+        self.path = path
+        self.views = views
+        self.loaded = {}
+
+    def get(self, weight: str, mask: np.ndarray | None) -> HubLabels | None:
+        key = (weight, mask_digest(self.graph, mask))
+        if key not in self.views:
+            return None
+        if key not in self.loaded:
+            with perf.stage("load_hub_labels"):
+                self.loaded[key] = self._read(*key)
+        return self.loaded[key]
+
+    def _read(self, metric: str, digest: str) -> HubLabels:
+        n = self.graph.n_nodes
+        out, inn = [{} for _ in range(n)], [{} for _ in range(n)]
+        con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            blobs = con.execute(f"SELECT {', '.join(COLUMNS)} FROM labels WHERE metric = ? AND mask = ?",
+                                (metric, digest)).fetchone()
+        finally:
+            con.close()
+        side, node, hub, dist, legs, edge = (np.frombuffer(b, dtype=dt).tolist()
+                                             for b, dt in zip(blobs, COLUMNS.values()))
+        for sd, v, h, d, k, j in zip(side, node, hub, dist, legs, edge):
+            (out if sd == OUT else inn)[v][h] = (d, k, j)
+        return HubLabels(self.graph, out, inn)
+
+def attach(graph: RouteGraph, path: Path = HUB_LABELS) -> HubLabelStore | None:
+    # makes shortest_path use the file's labels for graph; None when the file is missing
+    # or was built for another graph
+    if not path.exists():
+        return None
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+        if meta.get("fingerprint") != graph.fingerprint:
+            return None
+        views = {(m, d) for m, d in con.execute("SELECT metric, mask FROM labels")}
+    finally:
+        con.close()
+    store = HubLabelStore(graph, path, views)
+    attach_hub_labels(graph, store)
+    return store
+
+
+def refresh(cache: Path = CACHE, path: Path | None = None) -> dict[str, int]:
+    path = path or cache / HUB_LABELS.name
+    edges = read_cache(resolve_cache(cache, "edges_min_2025"))
+    graph = RouteGraph.from_edges(edges)
+    return build_hub_labels(graph, default_views(graph, default_price_range(edges)), path)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Precompute hub labels for exact single-route queries.")
+    ap.add_argument("--cache", type=Path, default=CACHE)
+    args = ap.parse_args(argv)
+    path = args.cache / HUB_LABELS.name
+    t0 = time.perf_counter()
+    built = refresh(args.cache, path)
+    print(f"wrote {path}: rebuilt {len(built)} (metric, view) label sets "
+          f"({sum(built.values()):,} entries) in {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
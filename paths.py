@@ -0,0 +1,621 @@
+from __future__ import annotations
+from collections import deque
+from heapq import heappop, heappush
+import weakref
+import numpy as np
+
+import perf
+from routegraph import RouteGraph, WEIGHTS
+
+INF = float("inf")
+
+
+_TOPOLOGY = weakref.WeakKeyDictionary()
+
+def _topology(graph: RouteGraph) -> tuple[list, list, list, list, list]:
+    # list copies of the CSR arrays, shared by every search on the graph (read-only)
+    if graph not in _TOPOLOGY:
+        _TOPOLOGY[graph] = (graph.indptr.tolist(), graph.dst.tolist(), graph.src.tolist(),
+                            graph.rev_indptr.tolist(), graph.rev_edges.tolist())
+    return _TOPOLOGY[graph]
+
+
+class _Search:
+    # Plain-list copies of one (graph, weight, mask) combination; list indexing is what
+    # keeps the heap loops fast in pure Python. Masked-out edges (by default the ones
+    # outside the graph's selected quarter) get an infinite weight.
+    def __init__(self, graph: RouteGraph, weight: str, mask: np.ndarray | None):
+        self.graph = graph
+        w = graph.weights[weight]
+        if mask is None:
+            mask = graph.active
+        if not mask.all():
+            w = np.where(mask, w, np.inf)
+        self.w = w.tolist()
+        self.indptr, self.dst, self.src, self.rev_indptr, self.rev_edges = _topology(graph)
+
+    def to_target(self, t: int) -> tuple[list[float], list[int], list[int]]:
+        # reverse Dijkstra: exact distance to t, next edge on the shortest-path tree and
+        # fewest hops to t (the latter by BFS) for every node
+        n = self.graph.n_nodes
+        dist, nxt = [INF] * n, [-1] * n
+        dist[t] = 0.0
+        heap = [(0.0, t)]
+        w, src, rind, redges = self.w, self.src, self.rev_indptr, self.rev_edges
+        while heap:
+            d, v = heappop(heap)
+            if d > dist[v]:
+                continue
+            for i in range(rind[v], rind[v + 1]):
+                j = redges[i]
+                nd = d + w[j]
+                u = src[j]
+                if nd < dist[u]:
+                    dist[u] = nd
+                    nxt[u] = j
+                    heappush(heap, (nd, u))
+
+        hops = [n] * n
+        hops[t] = 0
+        queue = deque([t])
+        while queue:
+            v = queue.popleft()
+            for i in range(rind[v], rind[v + 1]):
+                j = redges[i]
+                u = src[j]
+                if w[j] < INF and hops[u] == n:
+                    hops[u] = hops[v] + 1
+                    queue.append(u)
+        return dist, nxt, hops
+
+    def from_source(self, s: int) -> list[float]:
+        n = self.graph.n_nodes
+        dist = [INF] * n
+        dist[s] = 0.0
+        heap = [(0.0, s)]
+        w, dst, indptr = self.w, self.dst, self.indptr
+        while heap:
+            d, u = heappop(heap)
+            if d > dist[u]:
+                continue
+            for j in range(indptr[u], indptr[u + 1]):
+                nd = d + w[j]
+                v = dst[j]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heappush(heap, (nd, v))
+        return dist
+
+    def spur(self, s: int, t: int, h: list[float], min_hops: list[int],
+             banned_nodes: set, banned_edges: set, max_edges: int | None) -> list[int] | None:
+        # A* from s to t avoiding the bans, using the unrestricted distance-to-t as the
+        # (consistent) heuristic; with max_edges, states are (node, edges used)
+        if h[s] == INF or (max_edges is not None and min_hops[s] > max_edges):
+            return None
+        w, dst, indptr = self.w, self.dst, self.indptr
+        best = {(s, 0): 0.0}
+        prev = {}
+        settled = {}
+        # ties on f (common on zero-delay plateaus) go to the fewest total edges, which both
+        # heads straight for t and keeps zero-cost detours from winning
+        heap = [(h[s], min_hops[s], 0, 0.0, s, 0)]
+        while heap:
+            _, _, k, g, u, layer = heappop(heap)
+            if u in settled and settled[u] <= layer:
+                continue
+            settled[u] = layer
+            if u == t:
+                edges = []
+                state = (u, layer)
+                while state in prev:
+                    state, j = prev[state]
+                    edges.append(j)
+                return edges[::-1]
+            nk = k + 1
+            for j in range(indptr[u], indptr[u + 1]):
+                c = w[j]
+                if c == INF or j in banned_edges:
+                    continue
+                v = dst[j]
+                hv = h[v]
+                if hv == INF or v in banned_nodes:
+                    continue
+                if max_edges is not None and nk + min_hops[v] > max_edges:
+                    continue
+                key = (v, nk if max_edges is not None else 0)
+                if settled.get(v, INF) <= key[1]:
+                    continue
+                ng = g + c
+                if ng < best.get(key, INF):
+                    best[key] = ng
+                    prev[key] = ((u, layer), j)
+                    heappush(heap, (ng + hv, nk + min_hops[v], nk, ng, v, key[1]))
+        return None
+
+    def astar(self, s: int, t: int, h: list[float]) -> tuple[list[int] | None, int]:
+        # plain A* (Dijkstra when h is all zeros); returns the edges of a cheapest s-t
+        # path, or None, and the number of nodes settled
+        w, dst, indptr = self.w, self.dst, self.indptr
+        best = {s: 0.0}
+        prev = {}
+        settled = set()
+        # on equal f prefer the label that got further, which runs straight across zero-cost plateaus
+        heap = [(h[s], -0.0, s)]
+        while heap:
+            _, g, u = heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+            if u == t:
+                edges = []
+                while u in prev:
+                    j = prev[u]
+                    edges.append(j)
+                    u = self.src[j]
+                return edges[::-1], len(settled)
+            g = -g
+            for j in range(indptr[u], indptr[u + 1]):
+                c = w[j]
+                if c == INF:
+                    continue
+                v = dst[j]
+                hv = h[v]
+                if hv == INF or v in settled:
+                    continue
+                ng = g + c
+                if ng < best.get(v, INF):
+                    best[v] = ng
+                    prev[v] = j
+                    heappush(heap, (ng + hv, -ng, v))
+        return None, len(settled)
+
+    def cost(self, edges: list[int]) -> float:
+        w = self.w
+        total = 0.0
+        for j in edges:
+            total += w[j]
+        return total
+
+
+def distances_from(graph: RouteGraph, source: str, weight: str, mask: np.ndarray | None = None) -> np.ndarray:
+    return np.array(_Search(graph, weight, mask).from_source(graph.index[source]))
+
+def distances_to(graph: RouteGraph, target: str, weight: str, mask: np.ndarray | None = None) -> np.ndarray:
+    return np.array(_Search(graph, weight, mask).to_target(graph.index[target])[0])
+
+
+class Landmarks:
+    # ALT lower bounds for one (graph, weight): exact distances from and to a few
+    # spread-out landmark airports over every edge of the graph. By the triangle
+    # inequality d(v,t) >= d(L,t) - d(L,v) and d(v,t) >= d(v,L) - d(t,L); distances on
+    # a filtered subgraph can only be longer, so the bounds hold under any mask.
+    def __init__(self, graph: RouteGraph, weight: str, n: int = 8):
+        search = _Search(graph, weight, np.ones(graph.n_edges, dtype=bool))
+        out_deg = np.diff(graph.indptr)
+        chosen = [int(np.argmax(out_deg))]
+        d_from, d_to = [], []
+        while True:
+            L = chosen[-1]
+            d_from.append(np.array(search.from_source(L)))
+            d_to.append(np.array(search.to_target(L)[0]))
+            if len(chosen) == min(n, graph.n_nodes):
+                break
+            # next landmark: the airport farthest (round trip) from all chosen so far
+            round_trip = np.min(np.stack(d_from) + np.stack(d_to), axis=0)
+            round_trip[~np.isfinite(round_trip)] = -1.0
+            round_trip[chosen] = -np.inf
+            chosen.append(int(np.argmax(round_trip)))
+        self.landmarks = chosen
+        self.d_from = np.stack(d_from)
+        self.d_to = np.stack(d_to)
+
+    def to_target(self, t: int) -> list[float]:
+        with np.errstate(invalid="ignore"):
+            fwd = self.d_from[:, t, None] - self.d_from
+            back = self.d_to - self.d_to[:, t, None]
+        # inf - inf (landmark reaches neither) says nothing
+        bound = np.nan_to_num(np.maximum(fwd, back), nan=0.0, posinf=np.inf, neginf=0.0)
+        return np.maximum(bound.max(axis=0), 0.0).tolist()
+
+_LANDMARKS = weakref.WeakKeyDictionary()
+
+def landmarks(graph: RouteGraph, weight: str) -> Landmarks:
+    # built on first use and kept for the graph's lifetime
+    per_graph = _LANDMARKS.setdefault(graph, {})
+    if weight not in per_graph:
+        with perf.stage("build_landmarks"):
+            per_graph[weight] = Landmarks(graph, weight)
+    return per_graph[weight]
+
+
+class HubLabels:
+    # Exact distance labels for one (graph, weight, mask) by pruned landmark labelling.
+    # Every airport keeps its distance to and from a few hubs; hubs are processed busiest
+    # first and a search from a hub stops wherever the labels so far already give the
+    # distance, so on a hub-and-spoke network the labels stay short. Then
+    # d(s,t) = min over hubs h common to both labels of d(s,h) + d(h,t), and each label's
+    # shortest-path-tree edge walks the route out. Distances are (cost, legs) pairs
+    # compared in that order, so of several cheapest routes the one with fewest legs wins
+    # (on zero-delay plateaus the cost alone would allow long detours through hubs).
+    def __init__(self, graph: RouteGraph, out: list[dict], inn: list[dict]):
+        self.graph = graph
+        self.out = out    # node -> {hub: (cost to the hub, legs, first edge towards it)}
+        self.inn = inn    # node -> {hub: (cost from the hub, legs, last edge from it)}
+        _, self.dst, self.src, _, _ = _topology(graph)
+
+    @classmethod
+    def build(cls, graph: RouteGraph, weight: str, mask: np.ndarray | None = None) -> "HubLabels":
+        search = _Search(graph, weight, mask)
+        ranking = graph.view(mask).degree().sort_values(ascending=False, kind="stable")
+        labels = cls(graph, [{} for _ in range(graph.n_nodes)], [{} for _ in range(graph.n_nodes)])
+        for a in ranking.index:
+            labels._grow(search, graph.index[a], forward=True)
+            labels._grow(search, graph.index[a], forward=False)
+        return labels
+
+    def _grow(self, search: _Search, h: int, forward: bool):
+        # pruned Dijkstra from (forward) or to hub h; a node the labels already cover at
+        # this distance is neither labelled nor expanded
+        if forward:
+            ptr, ids, ends, labels = search.indptr, None, search.dst, self.inn
+        else:
+            ptr, ids, ends, labels = search.rev_indptr, search.rev_edges, search.src, self.out
+        w = search.w
+        best, via, done = {h: (0.0, 0)}, {h: -1}, set()
+        heap = [(0.0, 0, h)]
+        while heap:
+            d, k, v = heappop(heap)
+            if v in done:
+                continue
+            done.add(v)
+            if (self.meet(h, v) if forward else self.meet(v, h))[:2] <= (d, k):
+                continue
+            labels[v][h] = (d, k, via[v])
+            nk = k + 1
+            for i in range(ptr[v], ptr[v + 1]):
+                j = i if ids is None else ids[i]
+                c = w[j]
+                if not c < INF:
+                    continue
+                u = ends[j]
+                nd = d + c
+                if (nd, nk) < best.get(u, (INF, 0)):
+                    best[u] = (nd, nk)
+                    via[u] = j
+                    heappush(heap, (nd, nk, u))
+
+    def meet(self, s: int, t: int) -> tuple[float, int, int]:
+        # (cost, legs) of the best s-t route and the hub it goes through, or (inf, 0, -1)
+        ls, lt = self.out[s], self.inn[t]
+        best, hub = (INF, 0), -1
+        if len(ls) > len(lt):
+            for h, (d, k, _) in lt.items():
+                other = ls.get(h)
+                if other is not None and (other[0] + d, other[1] + k) < best:
+                    best, hub = (other[0] + d, other[1] + k), h
+        else:
+            for h, (d, k, _) in ls.items():
+                other = lt.get(h)
+                if other is not None and (d + other[0], k + other[1]) < best:
+                    best, hub = (d + other[0], k + other[1]), h
+        return best[0], best[1], hub
+
+    def route(self, s: int, t: int) -> list[int] | None:
+        # edges of a cheapest s-t path (fewest legs among those), or None
+        h = self.meet(s, t)[2]
+        if h < 0:
+            return None
+        nodes, edges = [s], []
+        u = s
+        while u != h:
+            j = self.out[u][h][2]
+            edges.append(j)
+            u = self.dst[j]
+            nodes.append(u)
+        tail = []
+        v = t
+        while v != h:
+            j = self.inn[v][h][2]
+            tail.append(j)
+            v = self.src[j]
+        for j in reversed(tail):
+            edges.append(j)
+            nodes.append(self.dst[j])
+        if len(set(nodes)) == len(nodes):
+            return edges
+        # the two halves can cross on a zero-cost stretch; cutting the loop costs nothing
+        kept_nodes, kept_edges, seen = [], [], {}
+        for i, u in enumerate(nodes):
+            if u in seen:
+                k = seen[u]
+                for x in kept_nodes[k + 1:]:
+                    del seen[x]
+                del kept_nodes[k + 1:], kept_edges[k:]
+            else:
+                seen[u] = len(kept_nodes)
+                kept_nodes.append(u)
+            if i < len(edges):
+                kept_edges.append(edges[i])
+        return kept_edges
+
+    def size(self) -> int:
+        return sum(map(len, self.out)) + sum(map(len, self.inn))
+
+_HUB_LABELS = weakref.WeakKeyDictionary()
+
+def attach_hub_labels(graph: RouteGraph, store):
+    # store.get(weight, mask) returns prebuilt HubLabels for that view of graph, or None;
+    # shortest_path answers from them whenever they exist
+    _HUB_LABELS[graph] = store
+
+def hub_labels(graph: RouteGraph, weight: str, mask: np.ndarray | None = None) -> HubLabels | None:
+    store = _HUB_LABELS.get(graph)
+    return store.get(weight, mask) if store is not None else None
+
+def shortest_path(graph: RouteGraph, source: str, target: str, weight: str,
+                  mask: np.ndarray | None = None, heuristic: bool = True,
+                  stats: dict | None = None, labels: bool = True) -> list[str]:
+    # one cheapest path: from hub labels when the graph has them for this view (and
+    # labels=True), else by A* with landmark (ALT) lower bounds, or plain Dijkstra with
+    # heuristic=False; stats, when given, receives the number of nodes settled
+    s, t = graph.index.get(source), graph.index.get(target)
+    if s is None or t is None:
+        return []
+    if s == t:
+        return [source]
+    hub = hub_labels(graph, weight, mask) if labels else None
+    if hub is not None:
+        perf.count("hub_label_queries")
+        if stats is not None:
+            stats["settled"] = 0
+        edges = hub.route(s, t)
+        return [] if edges is None else [source] + [graph.airports[hub.dst[j]] for j in edges]
+    search = _Search(graph, weight, mask)
+    h = landmarks(graph, weight).to_target(t) if heuristic else [0.0] * graph.n_nodes
+    edges, settled = search.astar(s, t, h)
+    perf.count("astar_settled", settled)
+    if stats is not None:
+        stats["settled"] = settled
+    if edges is None:
+        return []
+    return [source] + [graph.airports[search.dst[j]] for j in edges]
+
+
+def k_shortest_paths(graph: RouteGraph, source: str, target: str, weight: str, k: int,
+                     mask: np.ndarray | None = None, max_stops: int | None = None) -> list[list[str]]:
+    # Yen's k shortest loopless paths, cheapest first. Spur searches reuse the
+    # reverse shortest-path tree: as A* heuristic, and directly whenever the tree path
+    # from the spur node avoids every banned node and edge.
+    s, t = graph.index.get(source), graph.index.get(target)
+    if s is None or t is None or k < 1:
+        return []
+    if s == t:
+        return [[source]]
+    search = _Search(graph, weight, mask)
+    h, nxt, min_hops = search.to_target(t)
+    max_edges = None if max_stops is None else max_stops + 1
+
+    def tree_path(u: int, banned_nodes: set, banned_edges: set, limit: int | None) -> list[int] | None:
+        edges = []
+        while u != t:
+            j = nxt[u]
+            if j in banned_edges:
+                return None
+            u = search.dst[j]
+            if u in banned_nodes:
+                return None
+            edges.append(j)
+            if limit is not None and len(edges) > limit:
+                return None
+        return edges
+
+    first = tree_path(s, set(), set(), max_edges) if h[s] < INF else None
+    if first is None:
+        first = search.spur(s, t, h, min_hops, set(), set(), max_edges)
+    if first is None:
+        return []
+
+    found = [first]
+    found_nodes = [[s] + [search.dst[j] for j in first]]
+    seen = {tuple(first)}
+    candidates = []
+    while len(found) < k:
+        prev_edges, prev_nodes = found[-1], found_nodes[-1]
+        for i in range(len(prev_edges)):
+            spur_node = prev_nodes[i]
+            root = prev_edges[:i]
+            banned_edges = {p[i] for p in found if len(p) > i and p[:i] == root}
+            banned_nodes = set(prev_nodes[:i])
+            limit = None if max_edges is None else max_edges - i
+            if limit is not None and limit < 1:
+                continue
+            spur = tree_path(spur_node, banned_nodes, banned_edges, limit)
+            if spur is None:
+                perf.count("spur_searches")
+                spur = search.spur(spur_node, t, h, min_hops, banned_nodes, banned_edges, limit)
+            if spur is None:
+                continue
+            path = tuple(root + spur)
+            if path not in seen:
+                seen.add(path)
+                heappush(candidates, (search.cost(path), len(path), path))
+        if not candidates:
+            break
+        _, _, path = heappop(candidates)
+        found.append(list(path))
+        found_nodes.append([s] + [search.dst[j] for j in path])
+
+    perf.count("paths_enumerated", len(found))
+    names = graph.airports
+    return [[names[v] for v in nodes] for nodes in found_nodes]
+
+
+def fewest_hops_path(graph: RouteGraph, source: str, target: str,
+                     mask: np.ndarray | None = None, undirected: bool = False) -> list[str]:
+    # unweighted BFS; with undirected=True edges may be flown in either direction
+    s, t = graph.index.get(source), graph.index.get(target)
+    if s is None or t is None:
+        return []
+    active = (graph.active if mask is None else mask).tolist()
+    indptr, dst, src, rind, redges = _topology(graph)
+    prev = {s: None}
+    queue = deque([s])
+    while queue and t not in prev:
+        u = queue.popleft()
+        nbrs = [dst[j] for j in range(indptr[u], indptr[u + 1]) if active[j]]
+        if undirected:
+            nbrs += [src[j] for j in redges[rind[u]:rind[u + 1]] if active[j]]
+        for v in nbrs:
+            if v not in prev:
+                prev[v] = u
+                queue.append(v)
+    if t not in prev:
+        return []
+    path = [t]
+    while prev[path[-1]] is not None:
+        path.append(prev[path[-1]])
+    return [graph.airports[v] for v in reversed(path)]
+
+
+def _dominated(vec: tuple, bag: list[tuple]) -> bool:
+    # weakly dominated: some label in the bag is no worse on every criterion of vec
+    # (bag entries may carry trailing extra criteria, which are ignored)
+    for other in bag:
+        for a, b in zip(other, vec):
+            if a > b:
+                break
+        else:
+            return True
+    return False
+
+def pareto_paths(graph: RouteGraph, source: str, target: str, weights: tuple[str, ...] = WEIGHTS,
+                 mask: np.ndarray | None = None, max_stops: int = 2) -> list[tuple[list[str], tuple]]:
+    # Multi-criteria label-setting search: every route from source to target with at
+    # most max_stops stops that no other such route beats on all of `weights`, one per
+    # cost vector, as (path, costs) in lexicographic cost order. Labels carry the legs
+    # flown as an extra criterion so the stop cap stays exact, and are popped in
+    # lexicographic order, so a popped label is never dominated later.
+    s, t = graph.index.get(source), graph.index.get(target)
+    if s is None or t is None:
+        return []
+    if s == t:
+        return [([source], (0.0,) * len(weights))]
+    max_edges = max_stops + 1
+    searches = [_Search(graph, w, mask) for w in weights]
+    lower = []
+    for search in searches:
+        dist, _, min_hops = search.to_target(t)
+        lower.append(dist)
+    if lower[0][s] == INF or min_hops[s] > max_edges:
+        return []
+    ws = [search.w for search in searches]
+    h = list(zip(*lower))
+    indptr, dst = graph.indptr.tolist(), graph.dst.tolist()
+    nw = len(weights)
+
+    bags = [[] for _ in range(graph.n_nodes)]   # (costs..., legs) of labels kept per node
+    done = []                                   # costs of settled labels at the target
+    zero = (0.0,) * nw
+    heap = [(zero, 0, s, None)]
+    bags[s].append(zero + (0,))
+    while heap:
+        costs, legs, u, parent = heappop(heap)
+        if costs + (legs,) not in bags[u]:
+            continue                            # dominated after it was queued
+        if u == t:
+            done.append((costs, parent))
+            continue
+        if legs == max_edges:
+            continue
+        label = (costs, u, parent)
+        nl = legs + 1
+        for j in range(indptr[u], indptr[u + 1]):
+            v = dst[j]
+            hv = h[v]
+            if hv[0] == INF or nl + min_hops[v] > max_edges:
+                continue
+            c = tuple(costs[i] + ws[i][j] for i in range(nw))
+            if c[0] == INF:
+                continue
+            # a completion can do no better than c + h[v]; drop it if the target already has that
+            if _dominated(tuple(c[i] + hv[i] for i in range(nw)), bags[t]):
+                continue
+            vec = c + (nl,)
+            if _dominated(vec, bags[v]):
+                continue
+            bags[v] = [b for b in bags[v] if not all(x <= y for x, y in zip(vec, b))] + [vec]
+            heappush(heap, (c, nl, v, label))
+
+    names = graph.airports
+    out = []
+    for costs, parent in done:
+        nodes = [t]
+        while parent is not None:
+            _, u, parent = parent
+            nodes.append(u)
+        path = [names[v] for v in reversed(nodes)]
+        # the target's labels can still dominate each other through the legs criterion
+        if not out or not _dominated(costs, [c for _, c in out]):
+            out.append((path, costs))
+    return out
+
+
+def fallback_masks(graph: RouteGraph, price_range: tuple[float, float],
+                   max_delay: float) -> list[tuple[str, np.ndarray]]:
+    # the filter relaxations tried in order until a path exists
+    return [
+        ("filtered", graph.filter_mask(price_range, max_delay)),
+        ("price-only", graph.filter_mask(price_range)),
+        ("delay-only", graph.filter_mask(max_delay=1.0)),
+        ("no-filters", graph.filter_mask()),
+    ]
+
+def view_for_label(graph: RouteGraph, label: str, price_range: tuple[float, float], max_delay: float):
+    if label == "undirected-fallback":
+        return graph.view(undirected=True)
+    masks = dict(fallback_masks(graph, price_range, max_delay))
+    return graph.view(masks[label]) if label in masks else None
+
+@perf.timed("k_shortest_with_fallbacks")
+def k_shortest_with_fallbacks(
+    graph: RouteGraph,
+    s: str,
+    t: str,
+    weight: str,
+    k: int,
+    price_range: tuple[int, int],
+    max_delay: float,
+    max_stops: int | None = None,
+):
+    for label, mask in fallback_masks(graph, price_range, max_delay):
+        G_try = graph.view(mask)
+        if s not in G_try or t not in G_try:
+            continue
+        if k == 1 and max_stops is None:
+            # a single best route needs no Yen enumeration
+            path = shortest_path(graph, s, t, weight, mask=mask)
+            paths = [path] if path else []
+        else:
+            paths = k_shortest_paths(graph, s, t, weight, k, mask=mask, max_stops=max_stops)
+        if paths:
+            return paths, label, G_try
+
+    G_all_und = graph.view(undirected=True)
+    if s in G_all_und and t in G_all_und:
+        path = fewest_hops_path(graph, s, t, undirected=True)
+        if path:
+            return [path], "undirected-fallback", G_all_und
+
+    return [], "no-path", None
+
+@perf.timed("pareto_with_fallbacks")
+def pareto_with_fallbacks(graph: RouteGraph, s: str, t: str, weights: tuple[str, ...],
+                          price_range: tuple[int, int], max_delay: float, max_stops: int = 2):
+    # (frontier, label) under the first filter relaxation that connects s and t
+    for label, mask in fallback_masks(graph, price_range, max_delay):
+        if s not in graph.view(mask) or t not in graph.view(mask):
+            continue
+        frontier = pareto_paths(graph, s, t, weights, mask=mask, max_stops=max_stops)
+        if frontier:
+            return frontier, label
+    return [], "no-path"
@@ -0,0 +1,164 @@
+from __future__ import annotations
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:    # Windows: no getrusage, peak memory is not sampled
+    resource = None
+
+# Stage timers, counters and peak-memory samples for the app and the preprocessing.
+# Off unless SKYPATH_PERF=1 or enable() is called; while off, stage() hands back one
+# shared null context and count() returns after a single flag test.
+
+logger = logging.getLogger("skypath.perf")
+
+ENV_ENABLED = os.environ.get("SKYPATH_PERF", "") not in ("", "0")
+_enabled = ENV_ENABLED
+_lock = threading.Lock()
+_stages = {}      # name -> [calls, total seconds, max seconds]
+_counters = {}
+_holders = set()  # who asked for instrumentation through acquire()
+_NULL = nullcontext()
+
+
+def enabled() -> bool:
+    return _enabled
+
+def enable(log_path: Path | str | None = None):
+    # log_path (or SKYPATH_PERF_LOG) adds a JSON-lines file handler for the structured log
+    global _enabled
+    _enabled = True
+    log_path = log_path or os.environ.get("SKYPATH_PERF_LOG")
+    if log_path and not any(getattr(h, "baseFilename", None) == str(Path(log_path).resolve())
+                            for h in logger.handlers):
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def acquire(holder, log_path: Path | str | None = None):
+    # shared switch for concurrent users (app sessions): on while any holder wants it
+    with _lock:
+        _holders.add(holder)
+    enable(log_path)
+
+def release(holder, alive=None):
+    # off once no holder is left and SKYPATH_PERF is unset; alive(holder) -> False drops
+    # holders that went away without releasing
+    global _enabled
+    with _lock:
+        _holders.discard(holder)
+        if alive is not None:
+            _holders.difference_update([h for h in _holders if not alive(h)])
+        if not _holders and not ENV_ENABLED:
+            _enabled = False
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def count(name: str, n: int = 1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def record(name: str, seconds: float):
+    # one timing measured elsewhere, e.g. from the start of a rerun to its first render
+    if not _enabled:
+        return
+    with _lock:
+        calls, total, worst = _stages.get(name, (0, 0.0, 0.0))
+        _stages[name] = (calls + 1, total + seconds, max(worst, seconds))
+    if logger.handlers:
+        logger.info(json.dumps({"ts": time.time(), "event": "stage", "stage": name,
+                                "seconds": round(seconds, 6), "peak_rss_mb": peak_rss_mb(),
+                                "pid": os.getpid()}))
+
+@contextmanager
+def _timed(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+def stage(name: str):
+    # `with perf.stage("build_graph"):` times the block when instrumentation is on
+    return _timed(name) if _enabled else _NULL
+
+def timed(name: str):
+    # decorator form of stage()
+    def wrap(fn):
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _timed(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {"stages": {k: tuple(v) for k, v in _stages.items()}, "counters": dict(_counters)}
+
+def since(before: dict) -> dict:
+    # stages and counters accumulated after `before` (another snapshot()); with several
+    # sessions running at once this includes their work too
+    now = snapshot()
+    stages = {}
+    for name, (calls, total, worst) in now["stages"].items():
+        c0, t0, _ = before["stages"].get(name, (0, 0.0, 0.0))
+        if calls > c0:
+            stages[name] = (calls - c0, total - t0, worst)
+    counters = {k: v - before["counters"].get(k, 0) for k, v in now["counters"].items()
+                if v != before["counters"].get(k, 0)}
+    return {"stages": stages, "counters": counters}
+
+def stage_rows(data: dict | None = None) -> list[dict]:
+    data = data or snapshot()
+    return [{"stage": name, "calls": calls, "total_ms": round(total * 1e3, 3),
+             "mean_ms": round(total / calls * 1e3, 3), "max_ms": round(worst * 1e3, 3)}
+            for name, (calls, total, worst) in sorted(data["stages"].items(), key=lambda kv: -kv[1][1])]
+
+def report(data: dict | None = None, title: str = "timing report") -> str:
+    data = data or snapshot()
+    rows = stage_rows(data)
+    width = max([len(r["stage"]) for r in rows] + [5])
+    lines = [f"[PERF] {title}"]
+    lines += [f"  {r['stage']:<{width}}  {r['total_ms'] / 1e3:8.2f} s  x{r['calls']}" for r in rows]
+    lines += [f"  {name:<{width}}  {value:>10,}" for name, value in sorted(data["counters"].items())]
+    peak = peak_rss_mb()
+    if peak is not None:
+        lines.append(f"  {'peak rss':<{width}}  {peak:8.1f} MB")
+    return "\n".join(lines)
+
+def log_report(data: dict | None = None, **fields):
+    # one structured record with the whole report, e.g. at the end of a preprocessing run
+    if logger.handlers:
+        data = data or snapshot()
+        logger.info(json.dumps({"ts": time.time(), "event": "report", **fields,
+                                "stages": stage_rows(data), "counters": data["counters"],
+                                "peak_rss_mb": peak_rss_mb(), "pid": os.getpid()}))
@@ -0,0 +1,85 @@
+from __future__ import annotations
+from collections import OrderedDict
+from pathlib import Path
+import threading
+
+# the app's slider steps; filters on this grid are cacheable, anything finer is computed
+PRICE_BUCKET = 1.0
+DELAY_BUCKET = 0.01
+
+_MISSING = object()
+
+
+def bucket(value: float, step: float) -> int | None:
+    # grid index of value, or None when it is not (within float noise) on the grid
+    i = round(value / step)
+    return i if abs(i * step - value) <= 1e-9 * max(1.0, abs(value)) else None
+
+def files_version(paths: list[Path]) -> tuple:
+    # changes whenever one of the files is rewritten, created or removed
+    stamp = []
+    for p in paths:
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        stamp.append((p.name, st.st_size, st.st_mtime_ns))
+    return tuple(stamp)
+
+
+class LRUCache:
+    # Bounded, thread-safe mapping with least-recently-used eviction. Streamlit runs
+    # sessions on threads, so every access takes the lock; the value itself is computed
+    # outside it (two sessions missing on the same key may both compute it).
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        # key None means "not cacheable": compute and count it as bypassed
+        if key is None:
+            with self._lock:
+                self.bypassed += 1
+            return compute()
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "bypassed": self.bypassed, "evictions": self.evictions,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
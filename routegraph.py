@@ -0,0 +1,343 @@
+from __future__ import annotations
+from dataclasses import dataclass, replace
+from functools import cached_property
+import hashlib
+import numpy as np
+import pandas as pd
+
+import perf
+from startup import LATEST, PASSENGER_WEIGHTED
+
+WEIGHTS = ("distance", "fare", "delay", "co2")
+
+# edges-frame column behind each routing weight
+WEIGHT_COLS = {
+    "distance": "avg_distance_miles",
+    "fare": "wavg_itin_fare_usd",
+    "delay": "delay_rate",
+    "co2": "est_emissions_kgco2",
+}
+
+# per-quarter values kept for every edge; the weights, price and delay_rate of a graph
+# are one selection over these
+LAYER_COLS = ("avg_distance_miles", "wavg_itin_fare_usd", "delay_rate", "est_emissions_kgco2")
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a = np.ascontiguousarray(a)
+    a.flags.writeable = False
+    return a
+
+def _str_column(edges: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in edges.columns:
+        return np.full(len(edges), "", dtype=object)
+    s = edges[col].astype(object)
+    return s.where(s.map(lambda x: isinstance(x, str)), "").to_numpy(dtype=object)
+
+
+def build_carrier_index(edges: pd.DataFrame) -> dict:
+    # (Origin, Dest) -> carrier to show for that leg: the first non-empty primary_carrier
+    # seen for the pair, else the first entry of its carriers list
+    def text(col):
+        if col not in edges.columns:
+            return pd.Series("", index=edges.index, dtype=object)
+        s = edges[col].astype(object)
+        return s.where(s.map(lambda x: isinstance(x, str)))
+
+    firsts = (pd.DataFrame({"Origin": edges["Origin"].astype(object), "Dest": edges["Dest"].astype(object),
+                            "pc": text("primary_carrier"), "car": text("carriers")})
+                .groupby(["Origin","Dest"], sort=False)
+                .first())
+    pc = firsts["pc"].fillna("").astype(object).str.strip()
+    car = firsts["car"].fillna("").astype(object)
+    first_car = car.str.split(",").str[0].str.strip()
+    resolved = np.where(pc != "", pc, np.where(car.str.strip() != "", first_car, ""))
+    return dict(zip(firsts.index, resolved))
+
+
+def _latest(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    # each edge's value in the last quarter it appears in
+    last = present.shape[0] - 1 - np.argmax(present[::-1], axis=0)
+    return values[last, np.arange(values.shape[1])]
+
+def _weighted(values: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    # weighted mean over quarters, ignoring missing values; an edge whose known values
+    # all carry zero weight gets their plain mean
+    known = ~np.isnan(values)
+    x = np.where(known, values, 0.0)
+    w = np.where(known, weight, 0.0)
+    den = w.sum(axis=0)
+    n = known.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(den > 0, (w * x).sum(axis=0) / den, np.where(n > 0, x.sum(axis=0) / n, np.nan))
+
+
+@dataclass(frozen=True, eq=False)
+class RouteGraph:
+    # Immutable CSR route graph. Edges are sorted by (src, dst); edge e runs
+    # src[e] -> dst[e], the out-edges of node u are indptr[u]:indptr[u+1] and the
+    # in-edges of v are rev_edges[rev_indptr[v]:rev_indptr[v+1]].
+    # Every (Origin, Dest) is one edge whatever its quarters: layers[col] is a
+    # (quarters x edges) array (NaN where the edge has no row that quarter) and the
+    # routing arrays (weights, price, delay_rate, active) come from one selection
+    # over it, so switching quarter never rebuilds the topology.
+    airports: np.ndarray
+    index: dict
+    indptr: np.ndarray
+    src: np.ndarray
+    dst: np.ndarray
+    rev_indptr: np.ndarray
+    rev_edges: np.ndarray
+    weights: dict
+    price: np.ndarray
+    delay_rate: np.ndarray
+    primary_carrier: np.ndarray
+    carriers: np.ndarray
+    carrier: np.ndarray
+    carrier_index: dict
+    quarters: np.ndarray
+    layers: dict
+    present: np.ndarray
+    passengers: np.ndarray
+    active: np.ndarray
+    selection: str = LATEST
+
+    @classmethod
+    @perf.timed("build_graph")
+    def from_edges(cls, edges: pd.DataFrame, selection: str = LATEST) -> "RouteGraph":
+        perf.count("graph_builds")
+        ok = edges["Origin"].map(lambda x: isinstance(x, str)) & edges["Dest"].map(lambda x: isinstance(x, str))
+        e = edges[ok.astype(bool)]
+        carrier_index = build_carrier_index(e)
+        quarter = (e["quarter_tag"].astype(object) if "quarter_tag" in e.columns
+                   else pd.Series("", index=e.index, dtype=object))
+        e = e.assign(Origin=e["Origin"].astype(object), Dest=e["Dest"].astype(object),
+                     _quarter=quarter.where(quarter.map(lambda x: isinstance(x, str)), ""))
+        # one row per (Origin, Dest, quarter); the last row wins, as repeated DiGraph.add_edge did
+        rows = e.drop_duplicates(["Origin","Dest","_quarter"], keep="last")
+        # carrier text comes from each pair's last row
+        e = e.drop_duplicates(["Origin","Dest"], keep="last")
+
+        airports = np.array(sorted(set(e["Origin"]).union(e["Dest"])), dtype=object)
+        index = {a: i for i, a in enumerate(airports)}
+        src = e["Origin"].map(index).to_numpy(dtype=np.int32)
+        dst = e["Dest"].map(index).to_numpy(dtype=np.int32)
+        order = np.lexsort((dst, src))
+        src, dst = src[order], dst[order]
+        e = e.iloc[order]
+
+        n = len(airports)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        rev_edges = np.lexsort((src, dst)).astype(np.int32)
+        rev_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(dst, minlength=n), out=rev_indptr[1:])
+
+        def numeric(col):
+            if col not in rows.columns:
+                return np.full(len(rows), np.nan)
+            return pd.to_numeric(rows[col], errors="coerce").to_numpy(dtype=np.float64)
+
+        quarters = np.array(sorted(rows["_quarter"].unique()), dtype=object)
+        qi = np.searchsorted(quarters, rows["_quarter"].to_numpy(dtype=object))
+        ei = (rows["Origin"].map(index).to_numpy(dtype=np.int64) * n
+              + rows["Dest"].map(index).to_numpy(dtype=np.int64))
+        ei = np.searchsorted(src.astype(np.int64) * n + dst, ei)
+        shape = (len(quarters), len(src))
+        present = np.zeros(shape, dtype=bool)
+        present[qi, ei] = True
+        layers = {}
+        for col in LAYER_COLS + ("passengers",):
+            a = np.full(shape, np.nan)
+            a[qi, ei] = numeric(col)
+            layers[col] = _frozen(a)
+        passengers = layers.pop("passengers")
+
+        graph = cls(
+            airports=_frozen(airports), index=index,
+            indptr=_frozen(indptr), src=_frozen(src), dst=_frozen(dst),
+            rev_indptr=_frozen(rev_indptr), rev_edges=_frozen(rev_edges),
+            weights={}, price=None, delay_rate=None,
+            primary_carrier=_frozen(_str_column(e, "primary_carrier")),
+            carriers=_frozen(_str_column(e, "carriers")),
+            carrier=_frozen(np.array([carrier_index[k] for k in zip(e["Origin"], e["Dest"])], dtype=object)),
+            carrier_index=carrier_index,
+            quarters=_frozen(quarters), layers=layers, present=_frozen(present),
+            passengers=passengers, active=None,
+        )
+        return graph.select(selection)
+
+    @perf.timed("select_quarter")
+    def select(self, selection: str) -> "RouteGraph":
+        # the same topology with routing arrays for one quarter_tag, the latest quarter of
+        # each edge (LATEST) or the passenger-weighted mean over quarters (PASSENGER_WEIGHTED);
+        # edges absent from the selected quarter are inactive
+        if selection == LATEST:
+            pick = lambda a: _latest(a, self.present)
+            active = np.ones(self.n_edges, dtype=bool)
+        elif selection == PASSENGER_WEIGHTED:
+            pax = np.nan_to_num(self.passengers, nan=0.0)
+            if not pax.any():
+                pax = np.ones_like(pax)
+            weight = np.where(self.present, pax, 0.0)
+            pick = lambda a: _weighted(a, weight)
+            active = np.ones(self.n_edges, dtype=bool)
+        elif selection in set(self.quarters):
+            q = int(np.searchsorted(self.quarters, selection))
+            pick = lambda a: a[q]
+            active = self.present[q]
+        else:
+            raise ValueError(f"unknown quarter selection {selection!r}; expected {LATEST!r}, "
+                             f"{PASSENGER_WEIGHTED!r} or one of {', '.join(self.quarters)}")
+
+        values = {col: pick(a) for col, a in self.layers.items()}
+        # missing weights count as 0, like build_graph's `or 0.0` / delay fill
+        weights = {w: _frozen(np.nan_to_num(values[c], nan=0.0)) for w, c in WEIGHT_COLS.items()}
+        return replace(self, weights=weights,
+                       price=_frozen(values["wavg_itin_fare_usd"]),
+                       delay_rate=_frozen(values["delay_rate"]),
+                       active=_frozen(np.asarray(active, dtype=bool)), selection=selection)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.airports)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.src)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        # identifies the routable content (topology, weights, filter columns), not carriers
+        h = hashlib.sha1("\n".join(self.airports).encode("utf-8"))
+        for a in [self.src, self.dst, self.price, self.delay_rate, *(self.weights[w] for w in WEIGHTS)]:
+            h.update(a.tobytes())
+        if not self.active.all():
+            h.update(self.active.tobytes())
+        return h.hexdigest()
+
+    def to_edges(self) -> pd.DataFrame:
+        # the selection's routable columns in edges-cache form; from_edges(g.to_edges())
+        # rebuilds g's routing arrays
+        a = self.active
+        return pd.DataFrame({
+            "Origin": self.airports[self.src[a]], "Dest": self.airports[self.dst[a]],
+            "avg_distance_miles": self.weights["distance"][a],
+            "wavg_itin_fare_usd": self.price[a],
+            "delay_rate": self.delay_rate[a],
+            "est_emissions_kgco2": self.weights["co2"][a],
+        })
+
+    def leg_carrier(self, u: str, v: str) -> str:
+        return self.carrier_index.get((u, v), "")
+
+    def edge_id(self, u: str, v: str) -> int:
+        iu, iv = self.index.get(u), self.index.get(v)
+        if iu is None or iv is None:
+            return -1
+        lo, hi = self.indptr[iu], self.indptr[iu + 1]
+        j = lo + np.searchsorted(self.dst[lo:hi], iv)
+        return int(j) if j < hi and self.dst[j] == iv else -1
+
+    def filter_mask(self, price_range: tuple[float, float] | None = None,
+                    max_delay: float | None = None) -> np.ndarray:
+        # same semantics as the app's DataFrame filter: unknown fare never passes a price
+        # range, unknown delay rate counts as 0; edges outside the selected quarter never pass
+        mask = self.active.copy()
+        if price_range is not None:
+            p = np.where(np.isnan(self.price), np.inf, self.price)
+            mask &= (p >= price_range[0]) & (p <= price_range[1])
+        if max_delay is not None:
+            mask &= np.nan_to_num(self.delay_rate, nan=0.0) <= max_delay
+        return mask
+
+    def view(self, mask: np.ndarray | None = None, undirected: bool = False) -> "RouteView":
+        return RouteView(self, self.active if mask is None else mask, undirected)
+
+
+@dataclass(frozen=True, eq=False)
+class RouteView:
+    # A RouteGraph seen through an edge mask; covers the parts of the DiGraph API the app uses.
+    graph: RouteGraph
+    mask: np.ndarray
+    undirected: bool = False
+
+    def _active_nodes(self) -> np.ndarray:
+        g = self.graph
+        seen = np.zeros(g.n_nodes, dtype=bool)
+        seen[g.src[self.mask]] = True
+        seen[g.dst[self.mask]] = True
+        return seen
+
+    def __contains__(self, airport: str) -> bool:
+        i = self.graph.index.get(airport)
+        return i is not None and bool(self._active_nodes()[i])
+
+    def number_of_nodes(self) -> int:
+        return int(self._active_nodes().sum())
+
+    def number_of_edges(self) -> int:
+        return int(self.mask.sum())
+
+    def _edge(self, u: str, v: str) -> int:
+        j = self.graph.edge_id(u, v)
+        if j >= 0 and self.mask[j]:
+            return j
+        if self.undirected:
+            j = self.graph.edge_id(v, u)
+            if j >= 0 and self.mask[j]:
+                return j
+        return -1
+
+    def has_edge(self, u: str, v: str) -> bool:
+        return self._edge(u, v) >= 0
+
+    def _data(self, j: int) -> dict:
+        g = self.graph
+        d = {w: float(a[j]) for w, a in g.weights.items()}
+        d["primary_carrier"] = g.primary_carrier[j]
+        d["carriers"] = g.carriers[j]
+        d["carrier"] = g.carrier[j]
+        return d
+
+    def edge_data(self, u: str, v: str) -> dict | None:
+        j = self._edge(u, v)
+        return self._data(j) if j >= 0 else None
+
+    def out_edges(self, u: str, data: bool = False):
+        g = self.graph
+        i = g.index.get(u)
+        if i is None:
+            return
+        for j in range(g.indptr[i], g.indptr[i + 1]):
+            if self.mask[j]:
+                v = g.airports[g.dst[j]]
+                yield (u, v, self._data(j)) if data else (u, v)
+
+    def route_cost(self, path: list[str], weight: str) -> float:
+        # KeyError for a leg this view does not have, as G[u][v] raised on a DiGraph
+        w = self.graph.weights[weight]
+        total = 0.0
+        for u, v in zip(path, path[1:]):
+            j = self._edge(u, v)
+            if j < 0:
+                raise KeyError((u, v))
+            total += w[j]
+        return float(total)
+
+    def degree(self) -> pd.Series:
+        # undirected degree (distinct neighbours), as DiGraph.to_undirected().degree() reports
+        g = self.graph
+        a, b = g.src[self.mask], g.dst[self.mask]
+        pairs = np.unique(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1), axis=0)
+        deg = np.bincount(pairs[:, 0], minlength=g.n_nodes) + np.bincount(pairs[:, 1], minlength=g.n_nodes)
+        active = self._active_nodes()
+        return pd.Series(deg[active], index=g.airports[active], name="degree")
+
+    def to_networkx(self) -> nx.DiGraph | nx.Graph:
+        import networkx as nx    # only the benchmarks cross-check against networkx
+        g = self.graph
+        G = nx.Graph() if self.undirected else nx.DiGraph()
+        G.add_edges_from((g.airports[g.src[j]], g.airports[g.dst[j]], self._data(j))
+                         for j in np.flatnonzero(self.mask))
+        return G
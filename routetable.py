@@ -0,0 +1,217 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import sqlite3
+import time
+import numpy as np
+import pandas as pd
+
+import perf
+from colcache import read_cache, resolve_cache
+from paths import distances_from, distances_to, k_shortest_with_fallbacks, view_for_label
+from routegraph import RouteGraph, WEIGHTS
+from startup import DEFAULT_MAX_DELAY
+
+CACHE = Path("cache")
+ROUTE_TABLE = CACHE / "routes_2025.sqlite"
+
+# the app's default filter settings; the table only answers queries made with these
+DEFAULT_PRICE_CAP = 800
+TABLE_K = 10
+DEFAULT_TOP_N = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS pairs (
+    origin TEXT, dest TEXT, metric TEXT, label TEXT,
+    PRIMARY KEY (origin, dest, metric));
+CREATE TABLE IF NOT EXISTS routes (
+    origin TEXT, dest TEXT, metric TEXT, rank INTEGER, path TEXT, cost REAL,
+    PRIMARY KEY (origin, dest, metric, rank));
+"""
+
+
+def price_bounds(edges: pd.DataFrame) -> tuple[float, float]:
+    pmin = float(np.nanmin(edges["wavg_itin_fare_usd"]))
+    pmax = float(np.nanmax(edges["wavg_itin_fare_usd"]))
+    if not np.isfinite(pmin): pmin = 0.0
+    if not np.isfinite(pmax): pmax = 2000.0
+    return pmin, pmax
+
+def default_price_range(edges: pd.DataFrame) -> tuple[int, int]:
+    pmin, pmax = price_bounds(edges)
+    return int(pmin), min(DEFAULT_PRICE_CAP, int(pmax))
+
+def top_airports(nodes: pd.DataFrame, graph: RouteGraph, top_n: int) -> list[str]:
+    ranked = nodes.sort_values(["deg","Airport"], ascending=[False, True], kind="stable")["Airport"]
+    return [a for a in ranked.astype(str) if a in graph.index][:top_n]
+
+
+def _settings(airports: list[str], price_range: tuple[int, int], max_delay: float, k: int) -> str:
+    return json.dumps({"airports": airports, "price_range": list(price_range),
+                       "max_delay": max_delay, "k": k})
+
+def _stored_routes(con: sqlite3.Connection, metric: str) -> pd.DataFrame:
+    return pd.read_sql("SELECT r.origin, r.dest, r.rank, r.path, r.cost, p.label "
+                       "FROM routes r JOIN pairs p USING (origin, dest, metric) WHERE r.metric = ?",
+                       con, params=(metric,))
+
+def affected_pairs(old: RouteGraph, new: RouteGraph, con: sqlite3.Connection, airports: list[str],
+                   price_range: tuple[int, int], max_delay: float, k: int) -> dict[str, set]:
+    # Pairs whose stored answer can differ on the new graph. An edge that got worse (or
+    # left the filtered graph) only matters to pairs whose stored paths use it. An edge
+    # that got better can only create a path costing at least d(s,u) + w(u,v) + d(v,t),
+    # so it matters only where that bound reaches the pair's k-th stored cost.
+    old_mask = old.filter_mask(price_range, max_delay)
+    new_mask = new.filter_mask(price_range, max_delay)
+    old_e, new_e = old.to_edges(), new.to_edges()
+    keys = pd.concat([old_e[["Origin","Dest"]], new_e[["Origin","Dest"]]]).drop_duplicates()
+    all_pairs = {(s, t) for s in airports for t in airports if s != t}
+
+    out = {}
+    for metric in WEIGHTS:
+        eff = keys.copy()
+        for name, g, mask, e in [("old", old, old_mask, old_e), ("new", new, new_mask, new_e)]:
+            col = e[["Origin","Dest"]].assign(**{name: np.where(mask, g.weights[metric], np.inf)})
+            eff = eff.merge(col, on=["Origin","Dest"], how="left")
+        eff = eff.fillna({"old": np.inf, "new": np.inf})
+        worse = eff[eff["new"] > eff["old"]]
+        better = eff[eff["new"] < eff["old"]]
+
+        stored = _stored_routes(con, metric)
+        labels = pd.read_sql("SELECT origin, dest, label FROM pairs WHERE metric = ?", con, params=(metric,))
+        # relaxed-filter answers depend on edges outside the filtered graph; always redo them
+        relaxed = labels[labels["label"] != "filtered"]
+        hit = set(zip(relaxed["origin"], relaxed["dest"]))
+        hit |= all_pairs - set(zip(labels["origin"], labels["dest"]))
+
+        if not worse.empty:
+            bad_legs = set(zip(worse["Origin"], worse["Dest"]))
+            for s, t, path in zip(stored["origin"], stored["dest"], stored["path"]):
+                legs = path.split(" ")
+                if any(leg in bad_legs for leg in zip(legs, legs[1:])):
+                    hit.add((s, t))
+
+        if not better.empty:
+            idx = {a: i for i, a in enumerate(airports)}
+            kth = np.full((len(airports), len(airports)), np.inf)
+            filtered = stored[stored["label"] == "filtered"]
+            full = filtered.groupby(["origin","dest"])["cost"].agg(["max","size"]).reset_index()
+            full = full[full["size"] >= k]
+            kth[full["origin"].map(idx).to_numpy(), full["dest"].map(idx).to_numpy()] = full["max"].to_numpy()
+            d_from = np.stack([distances_from(new, a, metric, new_mask) for a in airports])
+            d_to = np.stack([distances_to(new, a, metric, new_mask) for a in airports], axis=1)
+            bound = np.full_like(kth, np.inf)
+            for u, v, w in zip(better["Origin"], better["Dest"], better["new"]):
+                if u in new.index and v in new.index:
+                    bound = np.minimum(bound, d_from[:, new.index[u], None] + w + d_to[None, new.index[v], :])
+            rows, cols = np.nonzero(np.isfinite(bound) & (bound <= kth * (1 + 1e-12)))
+            hit |= {(airports[i], airports[j]) for i, j in zip(rows, cols) if i != j}
+        out[metric] = hit & all_pairs
+    return out
+
+
+def build_route_table(graph: RouteGraph, nodes: pd.DataFrame, price_range: tuple[int, int],
+                      top_n: int = DEFAULT_TOP_N, max_delay: float = DEFAULT_MAX_DELAY,
+                      k: int = TABLE_K, path: Path = ROUTE_TABLE, full: bool = False) -> dict[str, int]:
+    airports = top_airports(nodes, graph, top_n)
+    settings = _settings(airports, price_range, max_delay, k)
+    path.parent.mkdir(exist_ok=True)
+    con = sqlite3.connect(path)
+    try:
+        con.executescript(SCHEMA)
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+        all_pairs = {(s, t) for s in airports for t in airports if s != t}
+        if full or meta.get("settings") != settings or "fingerprint" not in meta:
+            con.execute("DELETE FROM pairs")
+            con.execute("DELETE FROM routes")
+            todo = {m: all_pairs for m in WEIGHTS}
+        elif meta["fingerprint"] == graph.fingerprint:
+            todo = {m: set() for m in WEIGHTS}
+        else:
+            old = RouteGraph.from_edges(pd.read_sql("SELECT * FROM edges", con))
+            todo = affected_pairs(old, graph, con, airports, price_range, max_delay, k)
+
+        for metric, pairs in todo.items():
+            for s, t in sorted(pairs):
+                found, label, view = k_shortest_with_fallbacks(graph, s, t, metric, k, price_range, max_delay)
+                con.execute("DELETE FROM routes WHERE origin = ? AND dest = ? AND metric = ?", (s, t, metric))
+                con.execute("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?)", (s, t, metric, label))
+                con.executemany("INSERT INTO routes VALUES (?, ?, ?, ?, ?, ?)",
+                                [(s, t, metric, r, " ".join(p), view.route_cost(p, metric))
+                                 for r, p in enumerate(found)])
+
+        graph.to_edges().to_sql("edges", con, if_exists="replace", index=False)
+        con.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                        [("settings", settings), ("fingerprint", graph.fingerprint), ("top_n", str(top_n))])
+        con.commit()
+    finally:
+        con.close()
+    return {m: len(p) for m, p in todo.items()}
+
+
+@perf.timed("route_table_lookup")
+def lookup_routes(graph: RouteGraph, s: str, t: str, weight: str, k: int,
+                  price_range: tuple[int, int], max_delay: float, path: Path = ROUTE_TABLE):
+    # (paths, label, view) like k_shortest_with_fallbacks, or None when the table
+    # does not cover this query (other filters, larger k, stale table, unlisted pair)
+    if not path.exists():
+        return None
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        meta = dict(con.execute("SELECT key, value FROM meta").fetchall())
+        if meta.get("fingerprint") != graph.fingerprint:
+            return None
+        settings = json.loads(meta["settings"])
+        if (list(price_range) != settings["price_range"] or max_delay != settings["max_delay"]
+                or k > settings["k"]):
+            return None
+        row = con.execute("SELECT label FROM pairs WHERE origin = ? AND dest = ? AND metric = ?",
+                          (s, t, weight)).fetchone()
+        if row is None:
+            return None
+        found = [p.split(" ") for (p,) in con.execute(
+            "SELECT path FROM routes WHERE origin = ? AND dest = ? AND metric = ? ORDER BY rank LIMIT ?",
+            (s, t, weight, k))]
+    finally:
+        con.close()
+    label = row[0]
+    perf.count("route_table_hits")
+    return found, label, view_for_label(graph, label, price_range, max_delay)
+
+
+def refresh(cache: Path = CACHE, top_n: int | None = None, full: bool = False,
+            path: Path | None = None) -> dict[str, int] | None:
+    path = path or cache / ROUTE_TABLE.name
+    if top_n is None:
+        if not path.exists():
+            return None
+        con = sqlite3.connect(path)
+        try:
+            row = con.execute("SELECT value FROM meta WHERE key = 'top_n'").fetchone()
+        finally:
+            con.close()
+        top_n = int(row[0]) if row else DEFAULT_TOP_N
+    edges = read_cache(resolve_cache(cache, "edges_min_2025"))
+    nodes = read_cache(resolve_cache(cache, "nodes_2025"))
+    graph = RouteGraph.from_edges(edges)
+    return build_route_table(graph, nodes, default_price_range(edges), top_n=top_n, path=path, full=full)
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Precompute best-k routes between the top airports.")
+    ap.add_argument("--cache", type=Path, default=CACHE)
+    ap.add_argument("--top", type=int, default=None,
+                    help=f"number of airports by degree (default: keep the table's, else {DEFAULT_TOP_N})")
+    ap.add_argument("--full", action="store_true", help="recompute every pair instead of only stale ones")
+    args = ap.parse_args(argv)
+    path = args.cache / ROUTE_TABLE.name
+    t0 = time.perf_counter()
+    done = refresh(args.cache, args.top if args.top is not None or path.exists() else DEFAULT_TOP_N,
+                   args.full, path)
+    print(f"wrote {path}: recomputed {sum(done.values())} (pair, metric) entries "
+          f"in {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    main()
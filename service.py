@@ -0,0 +1,336 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl, urlencode, urlsplit
+from urllib.request import urlopen
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import multiprocessing as mp
+import os
+import signal
+import time
+import numpy as np
+import pandas as pd
+
+from resultcache import LRUCache
+from startup import (CACHE, DEFAULT_MAX_DELAY, LATEST, METRICS, QUARTER_AGGREGATES, ROUTES_RANGE, STOPS_RANGE,
+                     build_manifest, cache_version)
+
+# A local HTTP route service: one engine loaded in the server process, searches run on a
+# pool of forked workers that share its frames and graph arrays copy-on-write (columnar
+# caches stay memory-mapped), and identical queries in flight at the same time are
+# computed once. GET endpoints, JSON out:
+#   /health, /meta (the startup manifest), /stats,
+#   /routes?origin&dest[&metric&k&price_min&price_max&max_delay&quarter]  -> SkyPathEngine.page
+#   /pareto?origin&dest[&objectives&max_stops&price_min&price_max&max_delay&quarter]
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RESPONSE_CACHE_SIZE = 4096
+STALE_CHECK_S = 1.0
+DEFAULT_OBJECTIVES = ("fare", "co2", "delay")
+
+
+def encode_frame(df: pd.DataFrame) -> dict:
+    data = df.to_numpy(dtype=object, copy=True)
+    data[df.isna().to_numpy(dtype=bool)] = None
+    return {"columns": [str(c) for c in df.columns], "index": df.index.tolist(), "data": data.tolist()}
+
+def decode_frame(d: dict) -> pd.DataFrame:
+    return pd.DataFrame(d["data"], columns=d["columns"], index=d["index"])
+
+def encode_page(page: dict) -> dict:
+    out = {k: encode_frame(v) if isinstance(v, pd.DataFrame) else v for k, v in page.items()}
+    if page["best"] is not None:
+        out["best"] = dict(page["best"], legs=encode_frame(page["best"]["legs"]))
+    return out
+
+def decode_page(d: dict) -> dict:
+    page = {k: decode_frame(d[k]) if k in ("rows", "direct", "ranking", "sample") else v
+            for k, v in d.items()}
+    if d["best"] is not None:
+        page["best"] = dict(d["best"], legs=decode_frame(d["best"]["legs"]))
+    return page
+
+def _json_default(o):
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+def dumps(body) -> bytes:
+    return json.dumps(body, default=_json_default).encode()
+
+
+def _clamp(value: int, bounds: tuple[int, int]) -> int:
+    return min(max(value, bounds[0]), bounds[1])
+
+def parse_query(endpoint: str, params: dict[str, str], engine) -> tuple:
+    # the request's query as a hashable tuple, with the app's defaults filled in
+    missing = {"origin", "dest"} - set(params)
+    if missing:
+        raise ValueError(f"missing parameter(s): {', '.join(sorted(missing))}")
+    origin, dest = (params[p].strip().upper() for p in ("origin", "dest"))
+    lo, hi = engine.default_price_range
+    price_range = (float(params.get("price_min", lo)), float(params.get("price_max", hi)))
+    max_delay = float(params.get("max_delay", DEFAULT_MAX_DELAY))
+    if not all(math.isfinite(v) for v in (*price_range, max_delay)):
+        raise ValueError("price_min, price_max and max_delay must be finite numbers")
+    quarter = QUARTER_AGGREGATES.get(params.get("quarter", LATEST), params.get("quarter", LATEST))
+    if quarter not in set(QUARTER_AGGREGATES.values()) | set(engine.quarters):
+        raise ValueError(f"unknown quarter: {quarter}")
+    if endpoint == "routes":
+        metrics = (params.get("metric", "distance"),)
+        extra = (_clamp(int(params.get("k", 5)), ROUTES_RANGE),)
+    else:
+        metrics = tuple(m.strip() for m in params.get("objectives", ",".join(DEFAULT_OBJECTIVES)).split(",") if m.strip())
+        extra = (_clamp(int(params.get("max_stops", 2)), STOPS_RANGE),)
+    metrics = tuple(METRICS.get(m, m) for m in metrics)
+    bad = set(metrics) - set(METRICS.values())
+    if bad or not metrics:
+        raise ValueError(f"unknown metric(s): {', '.join(sorted(bad)) or '(none)'}")
+    return (endpoint, origin, dest, metrics, *extra, price_range, max_delay, quarter)
+
+
+_engine = None
+
+def _init_worker(cache: Path):
+    # forked workers inherit the server's engine; spawned ones load their own
+    global _engine
+    if _engine is None:
+        from engine import SkyPathEngine
+        _engine = SkyPathEngine.from_cache(cache)
+
+def _answer(query: tuple) -> bytes:
+    endpoint, origin, dest, metrics, extra, price_range, max_delay, quarter = query
+    engine = _engine.for_quarter(quarter)
+    if endpoint == "routes":
+        body = encode_page(engine.page(origin, dest, metrics[0], extra, price_range, max_delay))
+    else:
+        frontier, label = engine.pareto(origin, dest, metrics, price_range, max_delay, extra)
+        body = {"frontier": encode_frame(frontier), "label": label}
+    return dumps(body)
+
+
+class RouteService:
+    # Owns the engine, the worker pool and the response cache. Every request runs on the
+    # event loop; only the searches themselves go to the pool.
+    def __init__(self, cache: Path = CACHE, workers: int | None = None,
+                 cache_size: int = RESPONSE_CACHE_SIZE):
+        self.cache = Path(cache)
+        self.workers = workers or os.cpu_count() or 1
+        self.responses = LRUCache(cache_size)
+        self.inflight: dict[tuple, asyncio.Future] = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.reloads = 0
+        self.pool = None
+        self._checked = 0.0
+        self._pending = None
+        self._failed = None
+        self._reloading = None
+        self.swap(*self.load())
+
+    def load(self) -> tuple:
+        from engine import SkyPathEngine
+        engine = SkyPathEngine.from_cache(self.cache)
+        return engine, dumps(build_manifest(engine))
+
+    def swap(self, engine, manifest: bytes):
+        # serve from `engine` and fork the workers from it
+        global _engine
+        self.engine, self.manifest = engine, manifest
+        old = self.pool
+        methods = mp.get_all_start_methods()
+        ctx = mp.get_context("fork" if "fork" in methods else methods[0])
+        _engine = self.engine if ctx.get_start_method() == "fork" else None
+        self.pool = ProcessPoolExecutor(self.workers, mp_context=ctx, initializer=_init_worker,
+                                        initargs=(self.cache,))
+        if old is not None:
+            # searches already running on the old workers still finish
+            old.shutdown(wait=False)
+            self.responses.clear()
+            self.reloads += 1
+
+    def check_stale(self):
+        # A rebuild rewrites the cache files one by one: reload only once their version has
+        # held for a whole check interval, in the background, and keep serving this engine
+        # until the new one has loaded. A version that failed to load is not retried.
+        if self._reloading is not None or time.monotonic() - self._checked < STALE_CHECK_S:
+            return
+        self._checked = time.monotonic()
+        version = cache_version(self.cache)
+        if version in (self.engine.version, self._failed):
+            self._pending = None
+        elif version != self._pending:
+            self._pending = version
+        else:
+            self._pending = None
+            self._reloading = asyncio.ensure_future(self.reload(version))
+
+    async def reload(self, version: tuple):
+        try:
+            engine, manifest = await asyncio.get_running_loop().run_in_executor(None, self.load)
+        except Exception as e:
+            self._failed = version
+            print(f"reload failed, still serving the previous cache: {type(e).__name__}: {e}", flush=True)
+        else:
+            self.swap(engine, manifest)
+        finally:
+            self._reloading = None
+
+    async def compute(self, query: tuple) -> bytes:
+        key = query + (self.engine.version,)
+        body = self.responses.get(key)
+        if body is not None:
+            return body
+        fut = self.inflight.get(key)
+        if fut is None:
+            fut = asyncio.get_running_loop().run_in_executor(self.pool, _answer, query)
+            self.inflight[key] = fut
+            fut.add_done_callback(lambda f: self._settle(key, f))
+        else:
+            self.coalesced += 1
+        # one waiter disconnecting must not cancel the search for the others
+        return await asyncio.shield(fut)
+
+    def _settle(self, key: tuple, fut: asyncio.Future):
+        self.inflight.pop(key, None)
+        if not fut.cancelled() and fut.exception() is None:
+            self.responses.put(key, fut.result())
+
+    def stats(self) -> dict:
+        return {"version": json.loads(self.manifest)["version"], "workers": self.workers,
+                "requests": self.requests, "coalesced": self.coalesced, "inflight": len(self.inflight),
+                "reloads": self.reloads, "cache": self.responses.stats()}
+
+    async def respond(self, method: str, target: str) -> tuple[HTTPStatus, bytes]:
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, dumps({"error": f"{method} not allowed"})
+        url = urlsplit(target)
+        endpoint = url.path.strip("/")
+        params = dict(parse_qsl(url.query))
+        self.requests += 1
+        self.check_stale()
+        if endpoint == "health":
+            return HTTPStatus.OK, dumps({"status": "ok"})
+        if endpoint == "meta":
+            return HTTPStatus.OK, self.manifest
+        if endpoint == "stats":
+            return HTTPStatus.OK, dumps(self.stats())
+        if endpoint not in ("routes", "pareto"):
+            return HTTPStatus.NOT_FOUND, dumps({"error": f"no endpoint /{endpoint}"})
+        try:
+            query = parse_query(endpoint, params, self.engine)
+        except ValueError as e:
+            return HTTPStatus.BAD_REQUEST, dumps({"error": str(e)})
+        try:
+            return HTTPStatus.OK, await self.compute(query)
+        except Exception as e:
+            return HTTPStatus.INTERNAL_SERVER_ERROR, dumps({"error": f"{type(e).__name__}: {e}"})
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 with keep-alive; request bodies are read and ignored
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    status, body, keep = HTTPStatus.BAD_REQUEST, dumps({"error": "bad request line"}), False
+                elif not headers.get("content-length", "0").isdigit():
+                    status, body, keep = HTTPStatus.BAD_REQUEST, dumps({"error": "bad content-length"}), False
+                else:
+                    await reader.readexactly(int(headers.get("content-length", "0")))
+                    status, body = await self.respond(parts[0], parts[1])
+                    keep = parts[2] == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                             f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                             f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # stop cleanly so main() can shut the workers down with the server
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(sig, server.close)
+        print(f"serving {self.cache} on http://{host}:{port} with {self.workers} worker(s)", flush=True)
+        async with server:
+            with contextlib.suppress(asyncio.CancelledError):
+                await server.serve_forever()
+
+
+class RouteClient:
+    # The service's answers behind SkyPathEngine's method names, for app.py's service mode.
+    def __init__(self, url: str, quarter: str = LATEST, timeout: float = 60.0):
+        self.url = url.rstrip("/")
+        self.quarter = quarter
+        self.timeout = timeout
+
+    def for_quarter(self, selection: str) -> "RouteClient":
+        return RouteClient(self.url, selection, self.timeout)
+
+    def _get(self, endpoint: str, **params) -> dict:
+        url = f"{self.url}/{endpoint}" + (f"?{urlencode(params)}" if params else "")
+        try:
+            with urlopen(url, timeout=self.timeout) as r:
+                return json.loads(r.read())
+        except HTTPError as e:
+            error = json.loads(e.read()).get("error", e.reason)
+            raise (ValueError if e.code == HTTPStatus.BAD_REQUEST else RuntimeError)(f"/{endpoint}: {error}") from None
+
+    def meta(self) -> dict:
+        return self._get("meta")
+
+    def stats(self) -> dict:
+        return self._get("stats")
+
+    def page(self, origin: str, dest: str, weight: str, k: int, price_range: tuple[float, float],
+             max_delay: float) -> dict:
+        return decode_page(self._get("routes", origin=origin, dest=dest, metric=weight, k=k,
+                                     price_min=price_range[0], price_max=price_range[1],
+                                     max_delay=max_delay, quarter=self.quarter))
+
+    def pareto(self, s: str, t: str, weights: tuple[str, ...], price_range: tuple[float, float],
+               max_delay: float, max_stops: int = 2) -> tuple[pd.DataFrame, str]:
+        d = self._get("pareto", origin=s, dest=t, objectives=",".join(weights), max_stops=max_stops,
+                      price_min=price_range[0], price_max=price_range[1],
+                      max_delay=max_delay, quarter=self.quarter)
+        return decode_frame(d["frontier"]), d["label"]
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Serve SkyPath route queries over HTTP.")
+    ap.add_argument("--cache", type=Path, default=CACHE)
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--workers", type=int, default=None, help="search processes (default: all cores)")
+    args = ap.parse_args(argv)
+    service = RouteService(args.cache, args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    finally:
+        service.pool.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+from pathlib import Path
+import argparse
+import json
+import time
+
+from resultcache import files_version
+
+# What the app needs before any data is loaded: its constants and a small manifest of the
+# cache (airports, fare bounds, quarters, the default-filter ranking) written next to it by
+# datalogging.py. Importing this module must stay cheap: no numpy, pandas or graph code.
+
+CACHE = Path("cache")
+MANIFEST = "startup.json"
+RANKING_SIZE = 20
+
+# selections that combine quarters; any quarter_tag present in the edges is also one
+LATEST = "latest"
+PASSENGER_WEIGHTED = "passengers"
+
+# the app's default delay filter; the route table only answers queries made with it
+DEFAULT_MAX_DELAY = 0.4
+
+# bounds of the app's "How many routes?" and Pareto "Max stops" inputs
+ROUTES_RANGE = (1, 10)
+STOPS_RANGE = (0, 3)
+
+# app labels of the quarter selections that combine quarters
+QUARTER_AGGREGATES = {
+    "Latest": LATEST,
+    "Passenger-weighted": PASSENGER_WEIGHTED,
+}
+
+METRICS = {
+    "Distance (miles)": "distance",
+    "Fare (USD)": "fare",
+    "Delay rate": "delay",
+    "Emissions (kgCO2)": "co2",
+}
+
+
+def cache_version(cache: Path = CACHE) -> tuple:
+    # stamp of the cache files the engine loads; datalogging.py rewriting any of them changes it
+    return files_version([Path(cache) / f"{stem}{ext}"
+                          for stem in ("edges_min_2025", "nodes_2025") for ext in (".col", ".json")])
+
+def _stamp(version: tuple) -> list:
+    return [list(s) for s in version]
+
+
+def build_manifest(engine) -> dict:
+    # engine is a SkyPathEngine (LATEST selection); the ranking is the app's default view
+    view = engine.filtered_view(engine.default_price_range, DEFAULT_MAX_DELAY)
+    ranking = view.degree().sort_values(ascending=False, kind="stable").head(RANKING_SIZE)
+    return {
+        "version": _stamp(engine.version),
+        "airports": engine.airports,
+        "price_bounds": list(engine.price_bounds),
+        "default_price_range": list(engine.default_price_range),
+        "quarters": engine.quarters,
+        "default_filter": {
+            "airports": view.number_of_nodes(),
+            "routes": view.number_of_edges(),
+            "ranking": [[a, int(d)] for a, d in ranking.items()],
+        },
+    }
+
+def write_manifest(cache: Path = CACHE) -> Path:
+    from engine import SkyPathEngine    # the heavy part, only for writing
+    manifest = build_manifest(SkyPathEngine.from_cache(cache))
+    path = Path(cache) / MANIFEST
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest))
+    tmp.replace(path)
+    return path
+
+def read_manifest(cache: Path = CACHE) -> dict | None:
+    # None when there is no manifest or it was written for other cache files than these
+    try:
+        manifest = json.loads((Path(cache) / MANIFEST).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    if manifest.get("version") != _stamp(cache_version(cache)):
+        return None
+    return manifest
+
+
+def main(argv: list[str] | None = None):
+    ap = argparse.ArgumentParser(description="Write the app's startup manifest for an existing cache.")
+    ap.add_argument("--cache", type=Path, default=CACHE)
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    path = write_manifest(args.cache)
+    print(f"wrote {path} in {time.perf_counter() - t0:.2f} s")
+
+if __name__ == "__main__":
+    main()
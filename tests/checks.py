@@ -0,0 +1,48 @@
+from __future__ import annotations
+from itertools import islice
+import numpy as np
+import pandas as pd
+import networkx as nx
+from networkx.algorithms.simple_paths import shortest_simple_paths
+
+from paths import shortest_path
+from routegraph import RouteGraph
+
+# Random graphs and reference answers shared by the tests and the benchmarks.
+
+
+def random_edges(n_nodes: int, n_edges: int, rng: np.random.Generator) -> pd.DataFrame:
+    o = rng.integers(0, n_nodes, n_edges)
+    d = rng.integers(0, n_nodes, n_edges)
+    keep = o != d
+    o, d = o[keep], d[keep]
+    dist = rng.integers(50, 3000, len(o)).astype(float)
+    return pd.DataFrame({
+        "Origin": [f"N{i:03d}" for i in o], "Dest": [f"N{i:03d}" for i in d],
+        "avg_distance_miles": dist,
+        # integer-valued fares make ties common, which is where orderings can differ
+        "wavg_itin_fare_usd": rng.integers(0, 20, len(o)) * 25.0,
+        "delay_rate": np.where(rng.random(len(o)) < 0.3, np.nan, rng.random(len(o))),
+        "est_emissions_kgco2": dist * 1.60934 * 0.115,
+    })
+
+def nx_costs(G: nx.DiGraph, s: str, t: str, weight: str, k: int, max_stops: int | None) -> list[float]:
+    if max_stops is not None:
+        # filtering Yen's output by stops can enumerate forever; brute force the short paths
+        paths = nx.all_simple_paths(G, s, t, cutoff=max_stops + 1)
+        return sorted(nx.path_weight(G, p, weight) for p in paths)[:k]
+    try:
+        gen = shortest_simple_paths(G, s, t, weight=weight)
+        return [nx.path_weight(G, p, weight) for p in islice(gen, k)]
+    except nx.NetworkXNoPath:
+        return []
+
+def check_route(graph: RouteGraph, s: str, t: str, weight: str, mask, got: list[str]):
+    # same cost as plain Dijkstra, and a loopless path over edges of the view
+    want = shortest_path(graph, s, t, weight, mask, heuristic=False, labels=False)
+    assert bool(got) == bool(want), (s, t, weight)
+    if got:
+        view = graph.view(mask)
+        assert got[0] == s and got[-1] == t and len(set(got)) == len(got), got
+        assert all(view.has_edge(a, b) for a, b in zip(got, got[1:])), got
+        assert abs(view.route_cost(got, weight) - view.route_cost(want, weight)) <= 1e-9, (s, t, weight)
@@ -0,0 +1,35 @@
+from pathlib import Path
+import contextlib
+import shutil
+import sys
+import pytest
+
+# the modules live at the repo root; checks.py (shared with the benchmarks) next to this file
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests"))
+
+
+@pytest.fixture(scope="session")
+def synthetic_inputs(tmp_path_factory) -> Path:
+    # small synthetic BTS inputs under <dir>/dataset: two DB1B quarters and the flights file
+    from benchmarks.synth import generate
+    root = tmp_path_factory.mktemp("inputs")
+    generate(root, 20_000, airports=40, quarters=["2025_1", "2025_2"], seed=0)
+    return root
+
+@pytest.fixture(scope="session")
+def synthetic_edges(synthetic_inputs, tmp_path_factory) -> tuple:
+    # the edges and nodes datalogging.py builds from them
+    import datalogging
+    work = tmp_path_factory.mktemp("edges")
+    shutil.copytree(synthetic_inputs / "dataset", work / "dataset")
+    with contextlib.chdir(work):
+        edges = datalogging.build_edges_2025(workers=1)
+    return edges, datalogging.build_nodes_from_edges(edges)
+@pytest.fixture
+def workdir(synthetic_inputs, tmp_path, monkeypatch) -> Path:
+    # a copy of the inputs as the working directory; datalogging's paths are relative to it
+    shutil.copytree(synthetic_inputs / "dataset", tmp_path / "dataset")
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
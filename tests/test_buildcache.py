@@ -0,0 +1,60 @@
+from __future__ import annotations
+from pathlib import Path
+import os
+import pandas as pd
+import pytest
+
+import datalogging
+import perf
+from buildcache import BuildCache
+
+STAGES = {"db1b_merge", "otp_aggregate", "edges_merge"}
+
+
+@pytest.fixture
+def instrumented():
+    # the stages time themselves under perf.stage; that is how a recomputed one shows
+    perf.acquire("test_buildcache")
+    yield
+    perf.release("test_buildcache")
+
+def run(build_dir: Path) -> tuple[set[str], int, pd.DataFrame]:
+    # one datalogging run: the stages recomputed, the DB1B partitions rebuilt, the edges
+    before = perf.snapshot()
+    build = BuildCache(build_dir)
+    edges = datalogging.edge_stages(build, workers=1)
+    build.save()
+    done = perf.since(before)
+    return set(done["stages"]) & STAGES, done["counters"].get("db1b_partitions_built", 0), edges.frame()
+
+def edit_csv(path: Path, column: str, fn):
+    df = pd.read_csv(path)
+    rows = slice(0, max(1, len(df) // 100))
+    df.loc[rows, column] = fn(df.loc[rows, column])
+    df.to_csv(path, index=False)
+
+
+def test_rebuild_redoes_only_changed_stages(workdir, instrumented):
+    build_dir = datalogging.BUILD
+    assert run(build_dir)[:2] == (STAGES, 2)
+
+    stages, partitions, edges = run(build_dir)
+    assert (stages, partitions) == (set(), 0)
+
+    # a new mtime with the same contents changes nothing either
+    for f in datalogging.DATA.iterdir():
+        os.utime(f, (f.stat().st_atime, f.stat().st_mtime + 10))
+    assert run(build_dir)[:2] == (set(), 0)
+
+    edit_csv(datalogging.FLIGHTS_CSV, "Delay", lambda s: s.fillna(0) + 30)
+    stages, partitions, otp_edges = run(build_dir)
+    assert (stages, partitions) == ({"otp_aggregate", "edges_merge"}, 0)
+    assert not otp_edges.equals(edges)
+
+    edit_csv(datalogging.TICKET_CSV.with_name(datalogging.TICKET_CSV.name.replace("2025_1", "2025_2")),
+             "ItinFare", lambda s: s * 1.5)
+    stages, partitions, edges = run(build_dir)
+    assert (stages, partitions) == ({"db1b_merge", "edges_merge"}, 1)
+
+    # and what the reused stages add up to is what a build from scratch gives
+    pd.testing.assert_frame_equal(edges, datalogging.build_edges_2025(workers=1, rebuild=True))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pytest
+
+from colcache import FORMATS, read_cache, resolve_cache, write_cache
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def as_plain(df: pd.DataFrame) -> pd.DataFrame:
+    # categorical codes come back from the columnar reader; compare on decoded values
+    out = df.copy()
+    for c in out.columns:
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = out[c].astype(object).astype("str")
+    return out
+
+def sample_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Origin": ["DTW", "SFO", "DTW", "ANC"],
+        "primary_carrier": ["DL", None, "UA", "AS"],
+        "passengers": np.array([10, 0, 7, 3], dtype=np.int64),
+        "delay_rate": [0.1, np.nan, 0.25, 1.0],
+        "hub": [True, False, True, False],
+        "carriers_serving": [["DL", "UA"], [], ["UA"], ["AS", "DL", "UA"]],
+    })
+
+
+def test_columnar_round_trip(tmp_path):
+    frame = sample_frame()
+    path = tmp_path / "frame.col"
+    write_cache(frame, path)
+    pd.testing.assert_frame_equal(read_cache(path, use_mmap=False, categorical=False), frame)
+    pd.testing.assert_frame_equal(as_plain(read_cache(path)), read_cache(path, use_mmap=False, categorical=False))
+
+@pytest.mark.parametrize("stem", ["edges_2025", "edges_min_2025", "nodes_2025"])
+def test_shipped_cache_round_trip(tmp_path, stem):
+    df = read_cache(ROOT / "cache" / f"{stem}.json")
+    path = tmp_path / f"{stem}.col"
+    write_cache(df, path)
+    pd.testing.assert_frame_equal(read_cache(path, use_mmap=False, categorical=False), df)
+    pd.testing.assert_frame_equal(as_plain(read_cache(path)), df)
+
+def test_resolve_cache_prefers_columnar(tmp_path):
+    assert resolve_cache(tmp_path, "nodes_2025") == tmp_path / "nodes_2025.json"
+    for ext in FORMATS:
+        write_cache(sample_frame(), tmp_path / f"nodes_2025{ext}")
+    assert resolve_cache(tmp_path, "nodes_2025") == tmp_path / "nodes_2025.col"
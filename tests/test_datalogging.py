@@ -0,0 +1,21 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import pytest
+
+import datalogging
+
+CHUNKSIZE = 97
+
+
+@pytest.mark.parametrize("chunksize", [CHUNKSIZE, 1000])
+def test_streaming_matches_in_memory(workdir, chunksize):
+    # the sort-merge join must give the same edges with itineraries split across chunks
+    for coupon in datalogging.DATA.glob(datalogging.COUPON_GLOB):
+        ids = pd.read_csv(coupon, usecols=["ItinID"])["ItinID"].to_numpy()
+        cuts = np.arange(chunksize, len(ids), chunksize)
+        assert (ids[cuts - 1] == ids[cuts]).any(), f"no itinerary straddles a chunk of {coupon.name}"
+    in_memory = datalogging.build_edges_2025(streaming=False, workers=1, rebuild=True)
+    streamed = datalogging.build_edges_2025(streaming=True, chunksize=chunksize, workers=1, rebuild=True)
+    assert len(in_memory)
+    pd.testing.assert_frame_equal(streamed, in_memory)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+
+from checks import check_route, random_edges
+from hublabels import attach, build_hub_labels
+from paths import HubLabels, hub_labels, shortest_path
+from routegraph import RouteGraph, WEIGHTS
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_hub_labels_match_dijkstra(seed):
+    rng = np.random.default_rng(seed)
+    for trial in range(20):
+        graph = RouteGraph.from_edges(random_edges(int(rng.integers(5, 60)), int(rng.integers(10, 400)), rng))
+        mask = graph.filter_mask(max_delay=float(rng.uniform(0.2, 1.0))) if trial % 2 else None
+        for weight in WEIGHTS:
+            labels = HubLabels.build(graph, weight, mask)
+            for _ in range(5):
+                s, t = rng.choice(graph.airports, 2, replace=False)
+                edges = labels.route(graph.index[s], graph.index[t])
+                got = [] if edges is None else [s] + [graph.airports[graph.dst[j]] for j in edges]
+                check_route(graph, s, t, weight, mask, got)
+
+def test_stored_labels_answer_shortest_path(tmp_path):
+    # labels read back from the sqlite store are the ones shortest_path uses by default
+    rng = np.random.default_rng(0)
+    graph = RouteGraph.from_edges(random_edges(40, 300, rng))
+    views = {"all": None, "filtered": graph.filter_mask(max_delay=0.5)}
+    build_hub_labels(graph, views, tmp_path / "hub_labels.sqlite")
+    assert attach(graph, tmp_path / "hub_labels.sqlite") is not None
+    for mask in views.values():
+        for weight in WEIGHTS:
+            assert hub_labels(graph, weight, mask) is not None
+            for _ in range(20):
+                s, t = rng.choice(graph.airports, 2, replace=False)
+                check_route(graph, s, t, weight, mask, shortest_path(graph, s, t, weight, mask))
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import numpy as np
+import pytest
+
+from checks import nx_costs, random_edges
+from paths import k_shortest_paths
+from routegraph import RouteGraph, WEIGHTS
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_k_shortest_paths_match_networkx(seed):
+    # loopless paths over edges of the view, in the same cost order as networkx's Yen
+    rng = np.random.default_rng(seed)
+    for trial in range(20):
+        graph = RouteGraph.from_edges(random_edges(int(rng.integers(8, 40)), int(rng.integers(20, 200)), rng))
+        mask = graph.filter_mask(max_delay=0.7) if trial % 2 else None
+        view = graph.view(mask)
+        G = view.to_networkx()
+        for _ in range(5):
+            s, t = rng.choice(graph.airports, 2, replace=False)
+            if s not in G or t not in G:
+                continue
+            weight = WEIGHTS[int(rng.integers(0, len(WEIGHTS)))]
+            k = int(rng.integers(1, 12))
+            max_stops = None if trial % 3 else int(rng.integers(0, 4))
+            ours = k_shortest_paths(graph, s, t, weight, k, mask=mask, max_stops=max_stops)
+            for p in ours:
+                assert len(set(p)) == len(p) and all(view.has_edge(a, b) for a, b in zip(p, p[1:]))
+                assert max_stops is None or len(p) - 2 <= max_stops
+            assert len({tuple(p) for p in ours}) == len(ours)
+            got = [view.route_cost(p, weight) for p in ours]
+            want = nx_costs(G, s, t, weight, k, max_stops)
+            assert np.allclose(got, want, rtol=1e-9, atol=1e-9), (s, t, weight, k, max_stops, got, want)
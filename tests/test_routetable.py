@@ -0,0 +1,85 @@
+from __future__ import annotations
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+
+from colcache import write_cache
+from paths import view_for_label
+from routegraph import RouteGraph
+from routetable import ROUTE_TABLE, build_route_table, default_price_range, refresh
+from startup import DEFAULT_MAX_DELAY
+
+TOP_N = 15
+MIN_COLS = ["Origin","Dest","avg_distance_miles","wavg_itin_fare_usd","delay_rate",
+            "est_emissions_kgco2","quarter_tag","primary_carrier","passengers"]
+
+
+def table(path) -> dict[str, pd.DataFrame]:
+    con = sqlite3.connect(path)
+    try:
+        return {"pairs": pd.read_sql("SELECT * FROM pairs ORDER BY origin, dest, metric", con),
+                "routes": pd.read_sql("SELECT * FROM routes ORDER BY origin, dest, metric, rank", con)}
+    finally:
+        con.close()
+
+def perturb(edges: pd.DataFrame, change: str, rng: np.random.Generator) -> pd.DataFrame:
+    # keeps the cheapest and dearest fare rows, so the default price range (part of the
+    # table's settings) stays put and the refresh is incremental
+    e = edges.copy()
+    fare = e["wavg_itin_fare_usd"]
+    lo, hi = fare.min(), fare.max()
+    free = ~e.index.isin([fare.idxmin(), fare.idxmax()])
+    rows = free & (rng.random(len(e)) < 0.15)
+    if change in ("worse", "mixed"):
+        up = rows & (rng.random(len(e)) < 0.5) if change == "mixed" else rows
+        e.loc[up, "wavg_itin_fare_usd"] = (fare[up] * 1.5).clip(lo, hi)
+        e.loc[up, "delay_rate"] = (e.loc[up, "delay_rate"] + 0.3).clip(upper=1.0)
+        e.loc[up, "avg_distance_miles"] *= 1.2
+        e.loc[up, "est_emissions_kgco2"] *= 1.2
+    if change in ("better", "mixed"):
+        down = rows & ~up if change == "mixed" else rows
+        e.loc[down, "wavg_itin_fare_usd"] = (fare[down] * 0.6).clip(lo, hi)
+        e.loc[down, "delay_rate"] *= 0.3
+        e.loc[down, "avg_distance_miles"] *= 0.8
+        e.loc[down, "est_emissions_kgco2"] *= 0.8
+    if change in ("removed", "mixed"):
+        e = e[~(free & (rng.random(len(e)) < 0.05))]
+    return e.reset_index(drop=True)
+
+
+@pytest.mark.parametrize("change", ["worse", "better", "removed", "mixed"])
+def test_refresh_matches_full_rebuild(synthetic_edges, tmp_path, change):
+    edges, nodes = synthetic_edges
+    cache = tmp_path / "cache"
+    write_cache(edges[MIN_COLS], cache / "edges_min_2025.col")
+    write_cache(nodes, cache / "nodes_2025.col")
+    first = refresh(cache, TOP_N)
+    n_pairs = TOP_N * (TOP_N - 1)
+    assert all(n == n_pairs for n in first.values())
+
+    changed = perturb(edges, change, np.random.default_rng(1))
+    write_cache(changed[MIN_COLS], cache / "edges_min_2025.col")
+    done = refresh(cache, TOP_N)
+    # some pairs were recomputed, not all of them
+    assert 0 < sum(done.values()) < sum(first.values())
+
+    full = tmp_path / "full.sqlite"
+    build_route_table(RouteGraph.from_edges(changed[MIN_COLS]), nodes, default_price_range(changed),
+                      top_n=TOP_N, path=full)
+    got, want = table(cache / ROUTE_TABLE.name), table(full)
+    pd.testing.assert_frame_equal(got["pairs"], want["pairs"])
+    # row for row the same ranks and costs; where several paths tie on a cost, which of
+    # them Yen's search lists depends on unrelated weights, so those paths may differ
+    pd.testing.assert_frame_equal(got["routes"].drop(columns="path"), want["routes"].drop(columns="path"))
+    routes = got["routes"].assign(want=want["routes"]["path"])
+    tied = routes.duplicated(["origin","dest","metric","cost"], keep=False)
+    pd.testing.assert_series_equal(routes.loc[~tied, "path"], routes.loc[~tied, "want"], check_names=False)
+
+    # and every kept path is a route of the new graph costing what the table says
+    graph, price_range = RouteGraph.from_edges(changed[MIN_COLS]), default_price_range(changed)
+    routes = routes.merge(got["pairs"], on=["origin","dest","metric"])
+    for label, rows in routes.groupby("label"):
+        view = view_for_label(graph, label, price_range, DEFAULT_MAX_DELAY)
+        costs = [view.route_cost(p.split(" "), m) for p, m in zip(rows["path"], rows["metric"])]
+        np.testing.assert_allclose(costs, rows["cost"], rtol=1e-9)